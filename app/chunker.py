@@ -0,0 +1,126 @@
+# app/chunker.py
+import os
+
+import numpy as np
+
+from app.embedding_cache import encode_texts
+from app.model_provider import get_model
+
+# Token-aware chunking of long sections. all-MiniLM-L6-v2 only sees its first max_seq_length
+# tokens, so the whole-document section and long multi-page sections used to be tokenized in full
+# and then mostly truncated away. Long texts are instead split into overlapping token windows,
+# each window is embedded, and chunk scores are pooled (max or mean) back to their section.
+# Text beyond `max_chunks` windows is cut before tokenizing, since the model would never see it.
+MAX_CHARS_PER_TOKEN = 8 # Generous upper bound for WordPiece tokens, used for the pre-tokenization cap
+
+_settings = {
+    "enabled": os.environ.get("SECTION_CHUNKING", "1") != "0",
+    "pooling": os.environ.get("SECTION_CHUNK_POOLING", "max"),
+    "overlap_tokens": 32,
+    "max_chunks": 16,
+}
+
+def configure(enabled=None, pooling=None, overlap_tokens=None, max_chunks=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if pooling:
+        if pooling not in ("max", "mean"):
+            raise ValueError(f"Chunk pooling must be 'max' or 'mean', not '{pooling}'")
+        _settings["pooling"] = pooling
+    if overlap_tokens is not None:
+        _settings["overlap_tokens"] = int(overlap_tokens)
+    if max_chunks:
+        _settings["max_chunks"] = int(max_chunks)
+
+def get_settings():
+    """Returns a copy of the current settings, e.g. to record what a saved index was built with."""
+    return dict(_settings)
+
+def split_into_windows(text, tokenizer, window_tokens, overlap_tokens=None, max_chunks=None):
+    """
+    Splits `text` into at most `max_chunks` substrings of about `window_tokens` tokens each,
+    consecutive windows overlapping by `overlap_tokens`. Short texts are returned unchanged.
+    """
+    overlap_tokens = _settings["overlap_tokens"] if overlap_tokens is None else overlap_tokens
+    max_chunks = max_chunks or _settings["max_chunks"]
+    step = max(1, window_tokens - overlap_tokens)
+
+    # Cheap exit for texts that can't exceed the window, even at one character per token.
+    if len(text) <= window_tokens:
+        return [text]
+    # Never tokenize text beyond what max_chunks windows could cover.
+    text = text[:(step * (max_chunks - 1) + window_tokens) * MAX_CHARS_PER_TOKEN]
+
+    if getattr(tokenizer, "is_fast", False):
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+    else:
+        # Slow tokenizers have no offsets; fall back to whitespace words as a token approximation.
+        offsets = []
+        position = 0
+        for word in text.split():
+            start = text.index(word, position)
+            position = start + len(word)
+            offsets.append((start, position))
+
+    if len(offsets) <= window_tokens:
+        return [text]
+    chunks = []
+    for start_token in range(0, len(offsets), step):
+        end_token = min(start_token + window_tokens, len(offsets))
+        chunks.append(text[offsets[start_token][0]:offsets[end_token - 1][1]])
+        if end_token == len(offsets) or len(chunks) == max_chunks:
+            break
+    return chunks
+
+def chunk_texts(texts):
+    """
+    Splits every text that is longer than the model window into overlapping chunks.
+
+    Returns:
+        tuple: (chunks, chunk_owner). `chunk_owner[i]` is the index of the text chunk i came from,
+               or chunk_owner is None when chunking is disabled or no text needed splitting.
+    """
+    if not _settings["enabled"]:
+        return list(texts), None
+
+    model = get_model()
+    # Room for the [CLS] and [SEP] tokens the model adds around each window.
+    window_tokens = model.max_seq_length - 2
+    chunks = []
+    chunk_owner = []
+    for text_idx, text in enumerate(texts):
+        for chunk in split_into_windows(text, model.tokenizer, window_tokens):
+            chunks.append(chunk)
+            chunk_owner.append(text_idx)
+
+    if len(chunks) == len(texts):
+        return chunks, None
+    return chunks, np.array(chunk_owner, dtype=np.int64)
+
+def encode_sections(texts, batch_size=None, encode_fn=None):
+    """
+    Embeds section texts, chunking the long ones. All chunks go through one batched encode,
+    via `encode_fn` if given (e.g. the server's EncodeBatcher.encode) or encode_texts.
+
+    Returns:
+        tuple: (embeddings, chunk_owner). `embeddings` has one row per chunk; see chunk_texts().
+    """
+    chunks, chunk_owner = chunk_texts(texts)
+    if encode_fn is not None:
+        return encode_fn(chunks), chunk_owner
+    return encode_texts(chunks, batch_size=batch_size), chunk_owner
+
+def pool_chunk_scores(chunk_scores, chunk_owner, n_sections, pooling=None):
+    """
+    Pools a (queries, chunks) score matrix into (queries, sections) using max or mean pooling.
+    """
+    pooling = pooling or _settings["pooling"]
+    chunk_scores_t = np.ascontiguousarray(chunk_scores.T) # (chunks, queries)
+    if pooling == "max":
+        pooled = np.full((n_sections, chunk_scores.shape[0]), -np.inf, dtype=chunk_scores.dtype)
+        np.maximum.at(pooled, chunk_owner, chunk_scores_t)
+    else:
+        pooled = np.zeros((n_sections, chunk_scores.shape[0]), dtype=chunk_scores.dtype)
+        np.add.at(pooled, chunk_owner, chunk_scores_t)
+        pooled /= np.bincount(chunk_owner, minlength=n_sections)[:, None]
+    return pooled.T
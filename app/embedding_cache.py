@@ -0,0 +1,331 @@
+# app/embedding_cache.py
+import atexit
+import contextlib
+import hashlib
+import heapq
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+try:
+    import fcntl
+except ImportError: # Windows: the cache is then only safe for one process at a time
+    fcntl = None
+
+from app import tracing
+from app.model_provider import get_model, get_backend_name, encode_batched
+
+# Persistent on-disk store for text embeddings, so re-running the same collection
+# (e.g. with a new persona) only embeds what hasn't been seen before.
+# Layout per model: <cache_dir>/<model>/vectors.npy (memory-mapped float32 matrix with a fixed
+# number of rows), <cache_dir>/<model>/keys.npy (the SHA-1 of the text held in each row, all
+# zeros for a free row) and <cache_dir>/<model>/index.json (content hash -> row and last-use tick).
+#
+# Several processes may share a cache directory (the server next to one-shot runs, parallel
+# batch jobs). Every read and write of the files happens under an flock on cache.lock, and
+# keys.npy is the shared record of which rows are taken: rows are only allocated where it is
+# zero, and a lookup only trusts a row whose key matches, so a row another process evicted and
+# reused is a miss, never a wrong vector. index.json is re-read whenever another process has
+# rewritten it, and merged with this process's entries before it is written. Writing it takes
+# a while for a full cache, so it is saved at most every `save_interval` seconds while encoding,
+# and at the end of the run.
+DEFAULT_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", os.path.join(".cache", "embeddings"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 50000))
+DEFAULT_SAVE_INTERVAL = float(os.environ.get("EMBEDDING_CACHE_SAVE_INTERVAL", 60))
+INDEX_VERSION = 2
+KEY_BYTES = 20 # SHA-1 digest
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, model_name, dim, max_entries=DEFAULT_MAX_ENTRIES, save_interval=DEFAULT_SAVE_INTERVAL):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        safe_model_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name).strip('_')
+        self.directory = os.path.join(cache_dir, safe_model_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.npy")
+        self.keys_path = os.path.join(self.directory, "keys.npy")
+        self.index_path = os.path.join(self.directory, "index.json")
+        self._lock_file = open(os.path.join(self.directory, "cache.lock"), 'a')
+
+        self.entries = {} # content hash -> [row, last_used_tick]
+        self.clock = 0
+        with self._locked():
+            self._load()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # The thread lock serializes this process's threads, the flock the processes sharing the directory.
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _index_stat(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index_data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"EmbeddingCache: Could not read {self.index_path}: {e}. Starting with an empty cache.")
+            return None
+        if (index_data.get("version") != INDEX_VERSION or index_data.get("dim") != self.dim
+                or index_data.get("capacity") != self.max_entries):
+            return None
+        return index_data
+
+    def _load(self):
+        index_data = self._read_index()
+        if index_data is not None and os.path.exists(self.vectors_path) and os.path.exists(self.keys_path):
+            self.vectors = open_memmap(self.vectors_path, mode='r+')
+            self.row_keys = open_memmap(self.keys_path, mode='r+')
+            self.layout_id = index_data["layout_id"]
+            self.entries = {}
+            self.clock = 0
+            self._merge(index_data)
+            self._seen_index_stat = self._index_stat()
+        else:
+            # No cache yet, or it was written for a different format/dimension/capacity: start fresh.
+            # The new files are renamed into place, so another process's mapping of the old ones stays valid.
+            for path, dtype, shape in ((self.vectors_path, np.float32, (self.max_entries, self.dim)),
+                                       (self.keys_path, np.uint8, (self.max_entries, KEY_BYTES))):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape).flush()
+                os.replace(tmp_path, path)
+            self.vectors = open_memmap(self.vectors_path, mode='r+')
+            self.row_keys = open_memmap(self.keys_path, mode='r+')
+            self.layout_id = uuid.uuid4().hex
+            self.entries = {}
+            self.clock = 0
+            self._write_index()
+
+    def _valid_keys(self, entries):
+        # The keys of `entries` whose row still holds them.
+        if not entries:
+            return []
+        keys = list(entries)
+        rows = np.fromiter((entries[key][0] for key in keys), dtype=np.int64, count=len(keys))
+        digests = np.frombuffer(b"".join(bytes.fromhex(key) for key in keys), dtype=np.uint8).reshape(-1, KEY_BYTES)
+        valid = (self.row_keys[rows] == digests).all(axis=1)
+        return [key for key, is_valid in zip(keys, valid) if is_valid]
+
+    def _merge(self, index_data):
+        # Adds the index's entries whose row still holds their key; LRU ticks keep the later use.
+        self.clock = max(self.clock, index_data.get("clock", 0))
+        entries = index_data.get("entries", {})
+        for key in self._valid_keys(entries):
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = list(entries[key])
+            elif entry[0] == entries[key][0]:
+                entry[1] = max(entry[1], entries[key][1])
+
+    def _refresh(self):
+        # Picks up what other processes saved since this process last read or wrote index.json.
+        if self._index_stat() == self._seen_index_stat:
+            return
+        index_data = self._read_index()
+        if index_data is None or index_data.get("layout_id") != self.layout_id:
+            # The cache files were recreated by another process; entries in the old files are gone.
+            self._load()
+            return
+        self._merge(index_data)
+        self._seen_index_stat = self._index_stat()
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": INDEX_VERSION, "model": self.model_name, "dim": self.dim, "capacity": self.max_entries,
+                       "layout_id": self.layout_id, "clock": self.clock, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path) # Atomic, so a crash never leaves a half-written index
+        self._seen_index_stat = self._index_stat()
+
+    def _holds(self, row, key):
+        return self.row_keys[row].tobytes() == bytes.fromhex(key)
+
+    def key_for(self, text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def lookup(self, keys):
+        """
+        Returns a dict {position: embedding} for the keys that are cached, updating their LRU tick.
+        """
+        found = {}
+        with self._locked():
+            self._refresh()
+            for position, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is not None and not self._holds(entry[0], key):
+                    # Evicted by another process, which reused the row.
+                    del self.entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self.clock += 1
+                entry[1] = self.clock
+                found[position] = np.array(self.vectors[entry[0]])
+                self.hits += 1
+            if found:
+                self._dirty = True
+        return found
+
+    def _evict(self, count):
+        # Evicts the `count` least recently used rows. Taken rows without an entry here (stored by
+        # another process that has not saved yet, or left behind by one that crashed) count as oldest.
+        ticks = np.zeros(self.max_entries, dtype=np.int64)
+        owners = {}
+        for key, (row, tick) in self.entries.items():
+            ticks[row] = tick
+            owners[row] = key
+        taken_rows = np.flatnonzero(self.row_keys.any(axis=1))
+        for row in heapq.nsmallest(count, taken_rows.tolist(), key=lambda row: ticks[row]):
+            self.row_keys[row] = 0
+            key = owners.get(row)
+            if key is not None:
+                del self.entries[key]
+            self.evictions += 1
+
+    def store(self, keys, embeddings):
+        with self._locked():
+            self._refresh()
+            new_items = [(key, embedding) for key, embedding in zip(keys, embeddings)
+                         if key not in self.entries or not self._holds(self.entries[key][0], key)]
+            # Anything beyond the capacity can't be stored at all; keep the tail of the batch.
+            new_items = new_items[-self.max_entries:]
+            if not new_items:
+                return
+            free_rows = np.flatnonzero(~self.row_keys.any(axis=1))
+            shortfall = len(new_items) - len(free_rows)
+            if shortfall > 0:
+                self._evict(shortfall)
+                free_rows = np.flatnonzero(~self.row_keys.any(axis=1))
+            for (key, embedding), row in zip(new_items, free_rows.tolist()):
+                self.vectors[row] = embedding
+                self.row_keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self.clock += 1
+                self.entries[key] = [row, self.clock]
+            self._dirty = True
+
+    def save(self):
+        """Writes the index, merged with what other processes saved in the meantime."""
+        with self._locked():
+            if not self._dirty:
+                return
+            self._refresh()
+            # Drop entries whose rows other processes have evicted and reused since.
+            self.entries = {key: self.entries[key] for key in self._valid_keys(self.entries)}
+            self.vectors.flush()
+            self.row_keys.flush()
+            self._write_index()
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def maybe_save(self):
+        """Saves if there are unsaved changes and the last save is at least `save_interval` seconds ago."""
+        if self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def stats(self):
+        return {"entries": len(self.entries), "capacity": self.max_entries,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+_settings = {"enabled": os.environ.get("EMBEDDING_CACHE", "1") != "0",
+             "cache_dir": DEFAULT_CACHE_DIR,
+             "max_entries": DEFAULT_MAX_ENTRIES,
+             "save_interval": DEFAULT_SAVE_INTERVAL}
+_cache = None
+_cache_lock = threading.Lock()
+
+def configure(enabled=None, cache_dir=None, max_entries=None, save_interval=None):
+    """
+    Sets the cache location/size, how often the index is saved while encoding, or disables it.
+    Must be called before the first get_cache() call.
+    """
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if cache_dir:
+        _settings["cache_dir"] = cache_dir
+    if max_entries:
+        _settings["max_entries"] = int(max_entries)
+    if save_interval is not None:
+        _settings["save_interval"] = float(save_interval)
+
+def get_cache():
+    """Returns the shared EmbeddingCache for the current model, or None if caching is disabled."""
+    global _cache
+    if not _settings["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                dim = get_model().get_sentence_embedding_dimension()
+                _cache = EmbeddingCache(_settings["cache_dir"], get_backend_name(), dim, _settings["max_entries"],
+                                        _settings["save_interval"])
+                atexit.register(_cache.save)
+                print(f"EmbeddingCache: Using {_cache.directory} ({len(_cache.entries)} cached embeddings).")
+            except Exception as e:
+                # The cache is an optimisation only; fall back to always encoding.
+                print(f"EmbeddingCache: Could not open cache: {e}. Continuing without it.")
+                _settings["enabled"] = False
+    return _cache
+
+def encode_texts(texts, batch_size=None):
+    """
+    Returns an (N, dim) float32 matrix of normalised embeddings for `texts`, serving what it can
+    from the persistent cache and batch-encoding only the misses.
+    """
+    with tracing.span("encode_texts", texts=len(texts)) as trace_span:
+        cache = get_cache()
+        if cache is None:
+            return encode_batched(texts, batch_size=batch_size)
+
+        keys = [cache.key_for(text) for text in texts]
+        cached = cache.lookup(keys)
+        embeddings = np.zeros((len(texts), cache.dim), dtype=np.float32)
+        for position, embedding in cached.items():
+            embeddings[position] = embedding
+
+        missing_positions = [i for i in range(len(texts)) if i not in cached]
+        if missing_positions:
+            # Encode each distinct missing text once, even if it appears several times.
+            unique_missing = list(dict.fromkeys(keys[i] for i in missing_positions))
+            text_for_key = {keys[i]: texts[i] for i in missing_positions}
+            new_embeddings = encode_batched([text_for_key[key] for key in unique_missing], batch_size=batch_size)
+            embedding_for_key = dict(zip(unique_missing, new_embeddings))
+            for position in missing_positions:
+                embeddings[position] = embedding_for_key[keys[position]]
+            cache.store(unique_missing, new_embeddings)
+        # Writing the index takes a while for a full cache, so it is not saved on every call;
+        # long-running processes save it periodically, and every process at exit.
+        cache.maybe_save()
+        trace_span.set(cache_hits=len(cached), cache_misses=len(missing_positions))
+        tracing.count("embedding_cache.hits", len(cached))
+        tracing.count("embedding_cache.misses", len(missing_positions))
+        return embeddings
@@ -0,0 +1,131 @@
+# app/encoder_backends.py
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+
+# Encoder backends behind model_provider.get_model(). Every backend exposes the part of the
+# SentenceTransformer interface the rest of the app uses: encode(), tokenizer, max_seq_length,
+# device and get_sentence_embedding_dimension().
+#
+#   torch       SentenceTransformer as-is (default)
+#   torch-int8  SentenceTransformer with its Linear layers dynamically quantized to int8 (CPU only)
+#   onnx        onnxruntime session over a directory written by export_onnx(), float32 or int8
+BACKENDS = ("torch", "torch-int8", "onnx")
+ONNX_CONFIG_FILE = "encoder_config.json"
+
+def load_torch(model_name, device=None):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+def load_torch_int8(model_name):
+    """Loads the model on CPU and swaps every nn.Linear for a dynamically quantized int8 version."""
+    import torch
+    model = load_torch(model_name, device="cpu")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxEncoder:
+    """
+    Runs an exported transformer with onnxruntime and applies the SentenceTransformer pooling
+    (mean over non-padding tokens, then optional L2 normalisation) in numpy. Needs only
+    onnxruntime and the tokenizer at inference time, not torch.
+    """
+    def __init__(self, model_dir, num_threads=None):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), 'r') as f:
+            config = json.load(f)
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(os.path.join(model_dir, config["onnx_file"]), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = config["max_seq_length"]
+        self.dimension = config["dimension"]
+        self.device = f"cpu (onnxruntime, {config['onnx_file']})"
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, show_progress_bar=False):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            features = self.tokenizer(sentences[start:start + batch_size], padding=True, truncation=True,
+                                      max_length=self.max_seq_length, return_tensors="np")
+            feeds = {name: np.asarray(value, dtype=np.int64) for name, value in features.items() if name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0] # (batch, tokens, dim)
+            mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+            embeddings[start:start + batch_size] = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+def load_onnx(model_dir, num_threads=None):
+    if not model_dir or not os.path.exists(os.path.join(model_dir, ONNX_CONFIG_FILE)):
+        raise FileNotFoundError(f"No exported ONNX encoder in '{model_dir}'; create one with benchmarks/export_onnx.py.")
+    return OnnxEncoder(model_dir, num_threads=num_threads)
+
+def load_encoder(backend, model_name, device=None, onnx_dir=None, num_threads=None):
+    """Loads the encoder for one of BACKENDS."""
+    if backend == "torch":
+        return load_torch(model_name, device=device)
+    if backend == "torch-int8":
+        return load_torch_int8(model_name)
+    if backend == "onnx":
+        return load_onnx(onnx_dir, num_threads=num_threads)
+    raise ValueError(f"Unknown encoder backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+
+def export_onnx(model_name, output_dir, quantize=False, opset_version=14):
+    """
+    Exports the transformer of a SentenceTransformer model to `output_dir`/model.onnx along with
+    its tokenizer and an encoder_config.json, so load_onnx() can run it without torch. With
+    `quantize`, an int8 copy (model_int8.onnx, onnxruntime dynamic quantization) is written too
+    and becomes the file the config points at.
+    """
+    import torch
+
+    model = load_torch(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = model.tokenizer(["An example sentence for tracing the export."], return_tensors="pt")
+    input_names = list(sample.keys())
+
+    class TokenEmbeddings(torch.nn.Module):
+        # Positional inputs in tokenizer order, passed on by name, so the traced graph doesn't
+        # depend on the argument order of the transformer's forward().
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs)))[0]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    # Newer torch defaults to the dynamo exporter; the TorchScript one handles dynamic_axes directly.
+    export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    start_time = time.time()
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(), tuple(sample[name] for name in input_names), onnx_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset_version, **export_kwargs)
+    onnx_file = "model.onnx"
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(onnx_path, os.path.join(output_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+        onnx_file = "model_int8.onnx"
+
+    model.tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), 'w') as f:
+        json.dump({"source_model": model_name, "onnx_file": onnx_file, "max_seq_length": model.max_seq_length,
+                   "dimension": model.get_sentence_embedding_dimension()}, f, indent=4)
+    print(f"EncoderBackends: Exported {model_name} to {os.path.join(output_dir, onnx_file)} in {round(time.time() - start_time, 2)}s.")
+    return output_dir
@@ -0,0 +1,150 @@
+# app/extraction_cache.py
+import gzip
+import hashlib
+import json
+import os
+
+from app import pdf_backends
+
+# Per-file cache of PDF extraction results, so unchanged documents skip PDF parsing entirely.
+# Each entry is a gzip-compressed JSON file holding the file's size, mtime and SHA-256 digest,
+# the PDF backend that read it, the raw text of every page and the final section list produced
+# by extract_sections. Entries written by a different backend are treated as misses.
+# Next to each entry, a small <entry>.stat.json holds the fields needed to tell whether it is
+# still valid, so is_cached() can answer without decompressing the entry.
+# Bump CACHE_VERSION whenever the extraction logic changes its output.
+CACHE_VERSION = 1
+
+_settings = {
+    "enabled": os.environ.get("EXTRACTION_CACHE", "1") != "0",
+    "cache_dir": os.environ.get("EXTRACTION_CACHE_DIR", os.path.join(".cache", "extraction")),
+    "force_refresh": False,
+}
+
+def configure(enabled=None, cache_dir=None, force_refresh=None):
+    """Enables/disables the cache, sets its directory, or forces every file to be re-parsed."""
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if cache_dir:
+        _settings["cache_dir"] = cache_dir
+    if force_refresh is not None:
+        _settings["force_refresh"] = force_refresh
+
+def get_settings():
+    """Returns a copy of the current settings, e.g. to re-apply them in worker processes."""
+    return dict(_settings)
+
+def _entry_path(pdf_path):
+    path_key = hashlib.sha1(os.path.abspath(pdf_path).encode('utf-8')).hexdigest()
+    return os.path.join(_settings["cache_dir"], f"{path_key}.json.gz")
+
+def file_digest(pdf_path):
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _stat_path(entry_path):
+    return entry_path[:-len(".json.gz")] + ".stat.json"
+
+def _write_stat(entry_path, entry):
+    tmp_path = f"{entry_path}.{os.getpid()}.stat.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({key: entry.get(key) for key in ("version", "path", "backend", "size", "mtime_ns")}, f)
+    os.replace(tmp_path, _stat_path(entry_path))
+
+def _write_entry(entry_path, entry):
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+        json.dump(entry, f, separators=(',', ':'))
+    os.replace(tmp_path, entry_path) # Atomic, so parallel workers never see half-written entries
+    _write_stat(entry_path, entry)
+
+def load(pdf_path, force_refresh=False):
+    """
+    Returns the cached entry {'pages', 'sections', ...} for `pdf_path`, or None if there is no
+    valid entry. Size and mtime are checked first; if they changed, the content digest decides.
+    """
+    if not _settings["enabled"] or force_refresh or _settings["force_refresh"]:
+        return None
+
+    entry_path = _entry_path(pdf_path)
+    if not os.path.exists(entry_path):
+        return None
+    try:
+        with gzip.open(entry_path, 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+        stat = os.stat(pdf_path)
+    except Exception as e:
+        print(f"ExtractionCache: Ignoring unreadable cache entry for {pdf_path}: {e}")
+        return None
+
+    if entry.get("version") != CACHE_VERSION or entry.get("path") != os.path.abspath(pdf_path):
+        return None
+    # Entries written before the backend was recorded were all read by PyPDF2.
+    if entry.get("backend", "pypdf2") != pdf_backends.get_backend_name():
+        return None
+    if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry
+
+    # The file was touched or copied; only re-parse if its content actually changed.
+    if entry["size"] == stat.st_size and entry["digest"] == file_digest(pdf_path):
+        entry["mtime_ns"] = stat.st_mtime_ns
+        _write_entry(entry_path, entry)
+        return entry
+    return None
+
+def is_cached(pdf_path):
+    """
+    Returns True if load() would return an entry for `pdf_path`, checking only the file's size
+    and mtime against the entry's stat file. Only a file whose mtime changed at the same size, or
+    an entry written without a stat file, is checked by load() itself.
+    """
+    if not _settings["enabled"] or _settings["force_refresh"]:
+        return False
+    entry_path = _entry_path(pdf_path)
+    if not os.path.exists(entry_path):
+        return False
+    try:
+        with open(_stat_path(entry_path), 'r') as f:
+            entry_stat = json.load(f)
+    except FileNotFoundError:
+        entry = load(pdf_path)
+        if entry is not None:
+            _write_stat(entry_path, entry)
+        return entry is not None
+    except Exception:
+        return load(pdf_path) is not None
+    try:
+        stat = os.stat(pdf_path)
+    except OSError:
+        return False
+    if (entry_stat.get("version") != CACHE_VERSION or entry_stat.get("path") != os.path.abspath(pdf_path)
+            or entry_stat.get("backend") != pdf_backends.get_backend_name() or entry_stat.get("size") != stat.st_size):
+        return False
+    if entry_stat.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    # Touched or copied: the content digest decides, and load() records the new mtime.
+    return load(pdf_path) is not None
+
+def store(pdf_path, pages, sections):
+    """Writes the extraction result for `pdf_path` to the cache."""
+    if not _settings["enabled"]:
+        return
+    try:
+        stat = os.stat(pdf_path)
+        _write_entry(_entry_path(pdf_path), {
+            "version": CACHE_VERSION,
+            "path": os.path.abspath(pdf_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": file_digest(pdf_path),
+            "backend": pdf_backends.get_backend_name(),
+            "pages": pages,
+            "sections": sections,
+        })
+    except Exception as e:
+        # The cache is an optimisation only; a failed write just means a re-parse next time.
+        print(f"ExtractionCache: Could not cache {pdf_path}: {e}")
@@ -1,203 +1,581 @@
 # app/extractor.py (FINAL ATTEMPT: Prioritizing Correct Page Numbers for Content Blocks)
-import PyPDF2
 import re
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from app import extraction_cache
+from app import pdf_backends
+from app import tracing
+
+# Patterns used by the heading detector, compiled once at import time.
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Exclusions (common noise, page numbers, source tags, years, prices) combined into one search
+HEADING_EXCLUSION_PATTERN = re.compile(r'\b(?i:page|source)\s*\d+\b|^\$|\b\d{4}\b')
+NUMBERED_HEADING_PATTERN = re.compile(r"^\s*([IVXLCDM]+\.|\d+(\.\d+)*\.|[A-Z]\.)\s+[A-Z]")
+BULLET_HEADING_PATTERN = re.compile(r"^\s*[\u2022\u2023\u25E6\u2043]\s+[A-Z]")
+GENERIC_CAPS_WORDS = frozenset(["introduction", "conclusion", "references", "appendix"])
+GENERIC_TITLE_WORDS = frozenset(["chapter", "part", "section"])
 
 def clean_text_ligatures(text):
     """Clean common Unicode ligatures and replace multiple spaces/newlines with single space."""
     text = text.replace('\ufb04', 'ff').replace('\ufb03', 'fi').replace('\ufb01', 'fi')
-    return re.sub(r'\s+', ' ', text).strip()
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
 
-def is_potential_heading_balanced(line_raw):
+def is_heading_clean(line_clean):
     """
-    Checks if a line looks like a potential heading (strong or sub).
-    Less aggressive than previous 'hyper' versions to avoid over-splitting on noise.
+    Checks if an already-cleaned line (see clean_text_ligatures) looks like a potential heading.
+    Single pass over the line using the precompiled patterns above.
     """
-    line_clean = clean_text_ligatures(line_raw)
-    
     if len(line_clean) < 5 or len(line_clean) > 100: # Adjust max length if titles are very long
         return False
     
-    # Exclusions (common noise, page numbers, source tags, years)
-    if re.search(r'\b(page|source)\s*\d+\b', line_clean, re.IGNORECASE) or \
-       re.match(r'^\$', line_clean) or \
-       re.search(r'\b\d{4}\b', line_clean):
+    if HEADING_EXCLUSION_PATTERN.search(line_clean):
         return False
-        
+    
+    word_count = len(line_clean.split())
+    
     # Heuristic 1: All CAPS (strong indicator for main sections)
-    if line_clean.isupper() and len(line_clean.split()) > 1:
+    if line_clean.isupper() and word_count > 1:
         # Exclude common short ALL CAPS words that might not be true headings
-        if line_clean.lower() in ["introduction", "conclusion", "references", "appendix"]:
-            return False
-        return True
+        return line_clean.lower() not in GENERIC_CAPS_WORDS
 
     # Heuristic 2: Starts with Roman numerals, numbers, or single capital letter followed by period/space
-    if re.match(r"^\s*([IVXLCDM]+\.|\d+(\.\d+)*\.|[A-Z]\.)\s+[A-Z]", line_clean):
+    if NUMBERED_HEADING_PATTERN.match(line_clean):
         return True
         
     # Heuristic 3: Title Case and reasonable length, and not ending in sentence punctuation
-    if line_clean.istitle() and len(line_clean.split()) < 15 and not re.search(r'[\.\?\!]$', line_clean):
+    if line_clean.istitle() and word_count < 15 and not line_clean.endswith(('.', '?', '!')):
         # Exclude common short title-cased words that might not be true headings
-        if line_clean.lower() in ["chapter", "part", "section"]:
-            return False
-        return True
+        return line_clean.lower() not in GENERIC_TITLE_WORDS
 
     # Heuristic 4: Starts with a common bullet point and then capitalized text
-    if re.match(r"^\s*[\u2022\u2023\u25E6\u2043]\s+[A-Z]", line_clean) and len(line_clean.split()) > 1:
-        return True
+    return word_count > 1 and BULLET_HEADING_PATTERN.match(line_clean) is not None
+
+def is_potential_heading_balanced(line_raw):
+    """
+    Checks if a line looks like a potential heading (strong or sub).
+    Less aggressive than previous 'hyper' versions to avoid over-splitting on noise.
+    """
+    return is_heading_clean(clean_text_ligatures(line_raw))
 
-    return False
 
+def extract_sections(pdf_path, use_cache=True, force_refresh=False):
+    """
+    Returns the list of section dicts {'document', 'page_number', 'section_title', 'content'} for a PDF.
+    Unchanged files are served from the extraction cache; changed files are re-parsed automatically.
+    `force_refresh` re-parses the file even when a valid cache entry exists.
+    """
+    with tracing.span("extract_sections", document=os.path.basename(pdf_path)) as trace_span:
+        if use_cache:
+            cached_entry = extraction_cache.load(pdf_path, force_refresh=force_refresh)
+            if cached_entry is not None:
+                trace_span.set(cache_hit=True, sections=len(cached_entry["sections"]))
+                tracing.count("extraction_cache.hits")
+                return cached_entry["sections"]
 
-def extract_sections(pdf_path):
-    sections = []
-    full_text_pages_raw = [] # Stores raw content for each page
+        sections, full_text_pages_raw, parsed_ok = _extract_sections_uncached(pdf_path)
+        trace_span.set(cache_hit=False, pages=len(full_text_pages_raw), sections=len(sections), parsed_ok=parsed_ok)
+        tracing.count("extraction_cache.misses")
+        # Only cache complete parses, so a transient read error is retried next run.
+        if use_cache and parsed_ok:
+            extraction_cache.store(pdf_path, full_text_pages_raw, sections)
+        return sections
 
-    try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                text = page.extract_text()
-                full_text_pages_raw.append(text if text else "")
-
-            if not full_text_pages_raw:
-                return []
-
-            # Add the entire document as a primary section (always starts on page 1)
-            # This is critical for high-level relevance and serves as a fallback.
-            main_document_title = "Untitled Document"
-            if full_text_pages_raw[0]:
-                first_page_lines = [line.strip() for line in full_text_pages_raw[0].split('\n') if line.strip()]
-                if first_page_lines:
-                    main_document_title = clean_text_ligatures(first_page_lines[0])
-
-            sections.append({
-                "document": pdf_path.split(os.sep)[-1],
-                "page_number": 1,
-                "section_title": clean_text_ligatures(main_document_title),
-                "content": clean_text_ligatures("\n".join(full_text_pages_raw))
-            })
-
-            # Now, process page by page to identify more granular sections
-            # Each time a potential heading is found, finalize the previous block
-            # and start a new one, ensuring accurate page numbers.
-            current_section_content_lines = []
-            current_section_title = None
-            current_section_start_page = 1 
-
-            for page_idx, page_content_raw in enumerate(full_text_pages_raw):
-                current_page_num = page_idx + 1 # Page numbers are 1-based
-                lines = [line.strip() for line in page_content_raw.split('\n') if line.strip()]
-                
-                # If this is not the first page, and the previous section accumulated content,
-                # consider if the first line of this new page is a heading.
-                # This ensures multi-page sections are properly handled.
-                if page_idx > 0 and lines and current_section_content_lines:
-                    first_line_of_page = lines[0]
-                    if is_potential_heading_balanced(first_line_of_page) and \
-                       (current_section_title is None or \
-                        (clean_text_ligatures(first_line_of_page).lower() != current_section_title.lower() and \
-                         clean_text_ligatures(first_line_of_page).lower() not in current_section_title.lower() and \
-                         current_section_title.lower() not in clean_text_ligatures(first_line_of_page).lower())):
-                        
-                        # Finalize the previous section that spanned pages
-                        content_to_add = clean_text_ligatures("\n".join(current_section_content_lines))
-                        if content_to_add and len(content_to_add.split()) > 20: # Ensure meaningful content
-                            sections.append({
-                                "document": pdf_path.split(os.sep)[-1],
-                                "page_number": current_section_start_page,
-                                "section_title": current_section_title,
-                                "content": content_to_add
-                            })
-                            # Start a new section with this new page's heading
-                            current_section_content_lines = [first_line_of_page]
-                            current_section_title = clean_text_ligatures(first_line_of_page)
-                            current_section_start_page = current_page_num
-                            lines = lines[1:] # Process rest of lines on this page
-                        # Else, if the content is not meaningful, just append the new line and continue.
-                
-                for i, line_raw in enumerate(lines):
-                    # Check for internal headings within the current page
-                    is_new_candidate_heading = is_potential_heading_balanced(line_raw)
-                    
-                    if is_new_candidate_heading:
-                        # If a current section title exists and the new candidate is different and valid
-                        if current_section_title is not None and \
-                           clean_text_ligatures(line_raw).lower() != current_section_title.lower() and \
-                           clean_text_ligatures(line_raw).lower() not in current_section_title.lower() and \
-                           current_section_title.lower() not in clean_text_ligatures(line_raw).lower():
-                            
-                            # Finalize the previous content block
-                            if current_section_content_lines:
-                                content_to_add = clean_text_ligatures("\n".join(current_section_content_lines))
-                                if content_to_add and len(content_to_add.split()) > 20:
-                                    sections.append({
-                                        "document": pdf_path.split(os.sep)[-1],
-                                        "page_number": current_section_start_page, # Page where this finalized block started
-                                        "section_title": current_section_title,
-                                        "content": content_to_add
-                                    })
-                            
-                            # Start a new section with this heading
-                            current_section_content_lines = [line_raw]
-                            current_section_title = clean_text_ligatures(line_raw)
-                            current_section_start_page = current_page_num # This new section starts on current page
-                        else: # First heading found in the entire loop OR too similar to current title
-                            current_section_content_lines.append(line_raw) # Append to current content
-                            if current_section_title is None: # If this is the very first content block
-                                current_section_title = clean_text_ligatures(line_raw)
-                                current_section_start_page = current_page_num # This content block starts on current page
-                    else: # Not a heading, just content line
-                        current_section_content_lines.append(line_raw)
-            
-            # Add the very last accumulated section block
-            if current_section_content_lines and current_section_title:
-                content_to_add = clean_text_ligatures("\n".join(current_section_content_lines))
-                if content_to_add and len(content_to_add.split()) > 20:
-                    sections.append({
-                        "document": pdf_path.split(os.sep)[-1],
-                        "page_number": current_section_start_page, # Page where this last block started
-                        "section_title": current_section_title,
-                        "content": content_to_add
-                    })
+def _document_title(first_page_raw):
+    main_document_title = "Untitled Document"
+    if first_page_raw:
+        first_page_lines = [line.strip() for line in first_page_raw.split('\n') if line.strip()]
+        if first_page_lines:
+            main_document_title = clean_text_ligatures(first_page_lines[0])
+    return main_document_title
+
+class _SectionSplitter:
+    """
+    Page-by-page section segmentation. Each time a potential heading is found, the previous block
+    is finalized and a new one started, ensuring accurate page numbers. Pages are fed in order and
+    finished sections are returned as soon as their heading closes, so callers can stream them.
+    Every line is cleaned exactly once; the blocks hold cleaned lines, so finalizing a block is a join.
+    """
+    def __init__(self, document_name):
+        self.document_name = document_name
+        self.current_section_content_lines = [] # Cleaned lines of the current block
+        self.current_section_title = None
+        self.current_section_title_lower = None
+        self.current_section_start_page = 1
+
+    def _finalize_current(self):
+        # Returns the current block as a section if it has meaningful content, else None.
+        content_to_add = " ".join(self.current_section_content_lines)
+        if content_to_add and len(content_to_add.split()) > 20: # Ensure meaningful content
+            return {
+                "document": self.document_name,
+                "page_number": self.current_section_start_page, # Page where this finalized block started
+                "section_title": self.current_section_title,
+                "content": content_to_add
+            }
+        return None
+
+    def _is_new_title(self, line_lower):
+        # The candidate heading is different enough from the current title to start a new section.
+        title_lower = self.current_section_title_lower
+        return line_lower != title_lower and line_lower not in title_lower and title_lower not in line_lower
+
+    def _start_section(self, line_clean, line_lower, page_num):
+        self.current_section_content_lines = [line_clean]
+        self.current_section_title = line_clean
+        self.current_section_title_lower = line_lower
+        self.current_section_start_page = page_num
+
+    def feed_page(self, page_idx, page_content_raw):
+        """Processes one page of raw text and returns the list of sections it closed."""
+        finished_sections = []
+        current_page_num = page_idx + 1 # Page numbers are 1-based
+        lines = [clean_text_ligatures(line) for line in page_content_raw.split('\n')]
+        lines = [line for line in lines if line] # Drop blank lines
+        
+        # If this is not the first page, and the previous section accumulated content,
+        # consider if the first line of this new page is a heading.
+        # This ensures multi-page sections are properly handled.
+        if page_idx > 0 and lines and self.current_section_content_lines:
+            first_line_of_page = lines[0]
+            first_line_lower = first_line_of_page.lower()
+            if is_heading_clean(first_line_of_page) and \
+               (self.current_section_title is None or self._is_new_title(first_line_lower)):
+                # Finalize the previous section that spanned pages
+                finished_section = self._finalize_current()
+                if finished_section is not None:
+                    finished_sections.append(finished_section)
+                    # Start a new section with this new page's heading
+                    self._start_section(first_line_of_page, first_line_lower, current_page_num)
+                    lines = lines[1:] # Process rest of lines on this page
+                # Else, if the content is not meaningful, just append the new line and continue.
         
+        for line_clean in lines:
+            # Check for internal headings within the current page
+            if is_heading_clean(line_clean):
+                line_lower = line_clean.lower()
+                # If a current section title exists and the new candidate is different and valid
+                if self.current_section_title is not None and self._is_new_title(line_lower):
+                    # Finalize the previous content block
+                    if self.current_section_content_lines:
+                        finished_section = self._finalize_current()
+                        if finished_section is not None:
+                            finished_sections.append(finished_section)
+                    
+                    # Start a new section with this heading
+                    self._start_section(line_clean, line_lower, current_page_num)
+                else: # First heading found in the entire loop OR too similar to current title
+                    self.current_section_content_lines.append(line_clean) # Append to current content
+                    if self.current_section_title is None: # If this is the very first content block
+                        self.current_section_title = line_clean
+                        self.current_section_title_lower = line_lower
+                        self.current_section_start_page = current_page_num # This content block starts on current page
+            else: # Not a heading, just content line
+                self.current_section_content_lines.append(line_clean)
+        return finished_sections
+
+    def finish(self):
+        """Returns the very last accumulated section block, if any."""
+        if self.current_section_content_lines and self.current_section_title:
+            finished_section = self._finalize_current()
+            if finished_section is not None:
+                return [finished_section]
+        return []
+
+def _postprocess_section(section):
+    # Every section is built from already-cleaned text, so only the title heuristic is left to apply.
+    section_content_clean = section['content']
+    section_title_clean = section['section_title']
+    
+    # Heuristic to revert long, generic titles if they are essentially content
+    if len(section_title_clean.split()) > 15 and len(section_content_clean.split()) > 50:
+        section_title_clean = f"Content from Page {section['page_number']}"
+    
+    return {
+        "document": section["document"],
+        "page_number": section["page_number"],
+        "section_title": section_title_clean,
+        "content": section_content_clean
+    }
+
+def _page_fallback_sections(document_name, full_text_pages_raw, first_page_idx=0):
+    # Fallback: if somehow no sections were found, treat each page as a section
+    for page_num, content_raw in enumerate(full_text_pages_raw, start=first_page_idx):
+        cleaned_content = clean_text_ligatures(content_raw)
+        if cleaned_content:
+            yield {
+                "document": document_name,
+                "page_number": page_num + 1,
+                "section_title": f"Content from Page {page_num + 1}",
+                "content": cleaned_content
+            }
+
+def _read_pdf_pages(pdf_path, start=0, stop=None):
+    """
+    Returns (raw text of every page, parsed_ok), read with the configured PDF backend. `start` and
+    `stop` restrict the read to a page range. On a read error the pages read so far are returned.
+    """
+    full_text_pages_raw = [] # Stores raw content for each page
+    try:
+        for text in pdf_backends.get_backend().read_pages(pdf_path, start, stop):
+            full_text_pages_raw.append(text)
     except Exception as e:
         print(f"Error processing {pdf_path}: {e}")
-        
+        return full_text_pages_raw, False
+    return full_text_pages_raw, True
+
+def _split_sections(document_name, full_text_pages_raw):
+    """Returns the whole-document section followed by the sections found by the splitter."""
+    if not full_text_pages_raw:
+        return []
+
+    # Add the entire document as a primary section (always starts on page 1)
+    # This is critical for high-level relevance and serves as a fallback.
+    main_document_title = _document_title(full_text_pages_raw[0])
+    sections = [{
+        "document": document_name,
+        "page_number": 1,
+        "section_title": main_document_title,
+        "content": clean_text_ligatures("\n".join(full_text_pages_raw))
+    }]
+
+    # Now, process page by page to identify more granular sections
+    splitter = _SectionSplitter(document_name)
+    for page_idx, page_content_raw in enumerate(full_text_pages_raw):
+        sections.extend(splitter.feed_page(page_idx, page_content_raw))
+    # Add the very last accumulated section block
+    sections.extend(splitter.finish())
+    return sections
+
+def _finalize_sections(document_name, sections, full_text_pages_raw):
     # --- Final post-processing for cleaning and deduplication ---
     final_cleaned_sections = []
     seen_content_hashes = set() 
     
     for section in sections:
-        section_content_clean = clean_text_ligatures(section['content'])
-        section_title_clean = clean_text_ligatures(section['section_title'])
+        cleaned_section = _postprocess_section(section)
+        content_hash = hash(cleaned_section['content'])
         
-        # Heuristic to revert long, generic titles if they are essentially content
-        if len(section_title_clean.split()) > 15 and len(section_content_clean.split()) > 50:
-            section_title_clean = f"Content from Page {section['page_number']}"
-            
-        content_hash = hash(section_content_clean)
-        
-        if section_content_clean and content_hash not in seen_content_hashes:
-            final_cleaned_sections.append({
-                "document": section["document"],
-                "page_number": section["page_number"],
-                "section_title": section_title_clean,
-                "content": section_content_clean
-            })
+        if cleaned_section['content'] and content_hash not in seen_content_hashes:
+            final_cleaned_sections.append(cleaned_section)
             seen_content_hashes.add(content_hash)
             
     # Fallback: if somehow no sections were found (unlikely now), treat each page as a section
     if not final_cleaned_sections and full_text_pages_raw:
-        for page_num, content_raw in enumerate(full_text_pages_raw):
-            cleaned_content = clean_text_ligatures(content_raw)
-            if cleaned_content:
-                final_cleaned_sections.append({
-                    "document": pdf_path.split(os.sep)[-1],
-                    "page_number": page_num + 1,
-                    "section_title": f"Content from Page {page_num + 1}",
-                    "content": cleaned_content
-                })
-
-    return final_cleaned_sections
\ No newline at end of file
+        final_cleaned_sections.extend(_page_fallback_sections(document_name, full_text_pages_raw))
+
+    return final_cleaned_sections
+
+def _sections_from_pages(pdf_path, full_text_pages_raw, parsed_ok):
+    document_name = pdf_path.split(os.sep)[-1]
+    # A partially read document only gets the per-page fallback sections.
+    sections = _split_sections(document_name, full_text_pages_raw) if parsed_ok else []
+    return _finalize_sections(document_name, sections, full_text_pages_raw)
+
+def _extract_sections_uncached(pdf_path):
+    full_text_pages_raw, parsed_ok = _read_pdf_pages(pdf_path)
+    return _sections_from_pages(pdf_path, full_text_pages_raw, parsed_ok), full_text_pages_raw, parsed_ok
+
+def iter_sections(pdf_path, whole_document='keep', chunk_pages=10):
+    """
+    Streaming variant of extract_sections: reads the PDF one page at a time and yields each
+    section as soon as its heading closes, so downstream stages can start before the whole PDF
+    is parsed. Only the current section's lines are held in memory.
+    
+    Args:
+        pdf_path (str): Path of the PDF.
+        whole_document (str): What to do with the whole-document section:
+            'keep'  - yield it last (it needs every page, so its text is accumulated),
+            'drop'  - omit it, keeping memory bounded,
+            'chunk' - yield one section per `chunk_pages` pages instead, titled after the document.
+        chunk_pages (int): Pages per chunk in 'chunk' mode.
+        
+    Yields:
+        dict: Section dicts {'document', 'page_number', 'section_title', 'content'}, deduplicated
+              on exact content like extract_sections.
+    """
+    if whole_document not in ('keep', 'drop', 'chunk'):
+        raise ValueError(f"whole_document must be 'keep', 'drop' or 'chunk', not '{whole_document}'")
+
+    document_name = pdf_path.split(os.sep)[-1]
+    seen_content_hashes = set()
+    yielded_any = False
+    page_count = 0
+
+    def emit(raw_sections):
+        nonlocal yielded_any
+        for section in raw_sections:
+            cleaned_section = _postprocess_section(section)
+            content_hash = hash(cleaned_section['content'])
+            if cleaned_section['content'] and content_hash not in seen_content_hashes:
+                seen_content_hashes.add(content_hash)
+                yielded_any = True
+                yield cleaned_section
+
+    try:
+        splitter = _SectionSplitter(document_name)
+        main_document_title = None
+        whole_document_pages = [] # Cleaned page texts; only filled in 'keep' mode
+        chunk_page_texts = []
+        chunk_start_page = 1
+
+        for page_idx, page_content_raw in enumerate(pdf_backends.get_backend().read_pages(pdf_path)):
+            page_count += 1
+            if main_document_title is None:
+                main_document_title = _document_title(page_content_raw)
+
+            if whole_document == 'keep':
+                whole_document_pages.append(clean_text_ligatures(page_content_raw))
+            elif whole_document == 'chunk':
+                chunk_page_texts.append(clean_text_ligatures(page_content_raw))
+                if len(chunk_page_texts) == chunk_pages:
+                    yield from emit([_whole_document_chunk(document_name, main_document_title, chunk_start_page, chunk_page_texts)])
+                    chunk_page_texts = []
+                    chunk_start_page = page_idx + 2
+
+            yield from emit(splitter.feed_page(page_idx, page_content_raw))
+
+        yield from emit(splitter.finish())
+        if whole_document == 'chunk' and chunk_page_texts:
+            yield from emit([_whole_document_chunk(document_name, main_document_title, chunk_start_page, chunk_page_texts)])
+        if whole_document == 'keep' and page_count:
+            yield from emit([{
+                "document": document_name,
+                "page_number": 1,
+                "section_title": main_document_title,
+                "content": " ".join(page_text for page_text in whole_document_pages if page_text)
+            }])
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {e}")
+
+    if not yielded_any and page_count:
+        # Fallback: nothing qualified as a section, so re-read the pages and treat each as a section.
+        try:
+            for page_idx, page_content_raw in enumerate(pdf_backends.get_backend().read_pages(pdf_path)):
+                yield from _page_fallback_sections(document_name, [page_content_raw], page_idx)
+        except Exception as e:
+            print(f"Error processing {pdf_path}: {e}")
+
+def _whole_document_chunk(document_name, main_document_title, start_page, page_texts):
+    end_page = start_page + len(page_texts) - 1
+    return {
+        "document": document_name,
+        "page_number": start_page,
+        "section_title": f"{main_document_title} (Pages {start_page}-{end_page})",
+        "content": " ".join(page_text for page_text in page_texts if page_text)
+    }
+
+def _init_extraction_worker(cache_settings, pdf_settings):
+    # Worker processes may be spawned rather than forked, so re-apply the parent's settings.
+    extraction_cache.configure(**cache_settings)
+    pdf_backends.configure(**pdf_settings)
+    # Spans recorded in a worker would never reach the parent's trace; extract_collection records
+    # each document's worker-measured time instead.
+    tracing.configure(enabled=False)
+
+def _extract_sections_timed(pdf_path):
+    start_time = time.time()
+    sections = extract_sections(pdf_path)
+    return sections, time.time() - start_time
+
+def _read_page_range_timed(pdf_path, start, stop):
+    start_time = time.time()
+    pages, parsed_ok = _read_pdf_pages(pdf_path, start, stop)
+    return pages, parsed_ok, time.time() - start_time
+
+def _plan_extraction_tasks(pdf_paths):
+    """
+    Returns the pool tasks for a collection as (position, start, stop) tuples: (position, None, None)
+    extracts a whole document, anything else reads one page range of a document too large to be
+    a single task. Documents with a valid extraction cache entry are never split; that is checked
+    by file stat alone, and only the other documents are opened to count their pages.
+    """
+    range_size = pdf_backends.get_page_range_size()
+    tasks = []
+    for i, pdf_path in enumerate(pdf_paths):
+        page_count = 0
+        if range_size and not extraction_cache.is_cached(pdf_path):
+            try:
+                page_count = pdf_backends.get_backend().page_count(pdf_path)
+            except Exception:
+                page_count = 0 # The whole-document task reports the error
+        if page_count > range_size:
+            tasks.extend((i, start, stop) for start, stop in pdf_backends.page_ranges(page_count, range_size))
+        else:
+            tasks.append((i, None, None))
+    return tasks
+
+def _assemble_page_ranges(pdf_path, range_results):
+    """
+    Joins the page-range reads of a document in page order and splits the sections, exactly as
+    extract_sections does for a whole-document read. Returns (sections, seconds), where `seconds`
+    is the summed read time of the ranges plus the split.
+    """
+    start_time = time.time()
+    full_text_pages_raw, parsed_ok, seconds = [], True, 0.0
+    for start in sorted(range_results):
+        pages, range_ok, range_seconds = range_results[start]
+        seconds += range_seconds
+        if parsed_ok:
+            # Like a sequential read, stop at the first failed range, keeping the pages it did read.
+            full_text_pages_raw.extend(pages)
+            parsed_ok = range_ok
+    sections = _sections_from_pages(pdf_path, full_text_pages_raw, parsed_ok)
+    if parsed_ok:
+        extraction_cache.store(pdf_path, full_text_pages_raw, sections)
+    return sections, seconds + time.time() - start_time
+
+def iter_extracted_documents(pdf_paths, max_workers=None):
+    """
+    Extracts sections from several PDFs, one document per task across a process pool, yielding
+    each document as soon as it finishes so downstream stages can start on it right away.
+    Documents longer than pdf_backends' page range size are read as several page-range tasks,
+    so a single large PDF still uses the whole pool; its sections are split once all ranges are in.
+    
+    Args:
+        pdf_paths (list): Paths of the PDFs to extract.
+        max_workers (int, optional): Pool size. Defaults to one worker per CPU (capped at the
+            number of tasks); 1 runs everything in the current process.
+        
+    Yields:
+        tuple: (position, pdf_path, sections, seconds, error) in completion order, where `position`
+               is the path's index in `pdf_paths`. `error` is None on success; a failed document
+               has an empty section list.
+    """
+    if not pdf_paths:
+        return
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    tasks = _plan_extraction_tasks(pdf_paths) if max_workers > 1 else []
+    max_workers = max(1, min(max_workers, len(tasks)))
+
+    if max_workers == 1:
+        for i, pdf_path in enumerate(pdf_paths):
+            try:
+                sections, seconds = _extract_sections_timed(pdf_path)
+                yield i, pdf_path, sections, seconds, None
+            except Exception as e:
+                yield i, pdf_path, [], 0.0, e
+        return
+
+    broken = set()
+    worker_settings = (extraction_cache.get_settings(), pdf_backends.get_settings())
+    range_results = {}   # position -> {range start: (pages, parsed_ok, seconds)}
+    pending_ranges = {}  # position -> page-range tasks still running
+    range_errors = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_extraction_worker, initargs=worker_settings) as executor:
+        futures = {}
+        for i, start, stop in tasks:
+            if start is None:
+                futures[executor.submit(_extract_sections_timed, pdf_paths[i])] = (i, None)
+            else:
+                futures[executor.submit(_read_page_range_timed, pdf_paths[i], start, stop)] = (i, start)
+                pending_ranges[i] = pending_ranges.get(i, 0) + 1
+        for future in as_completed(futures):
+            i, start = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.add(i) # Retried below in an isolated worker
+                continue
+            except Exception as e:
+                if start is None:
+                    yield i, pdf_paths[i], [], 0.0, e
+                    continue
+                range_errors.setdefault(i, e)
+            else:
+                if start is None:
+                    sections, seconds = result
+                    yield i, pdf_paths[i], sections, seconds, None
+                    continue
+                range_results.setdefault(i, {})[start] = result
+
+            pending_ranges[i] -= 1
+            if pending_ranges[i] or i in broken:
+                continue
+            if i in range_errors:
+                yield i, pdf_paths[i], [], 0.0, range_errors[i]
+                continue
+            try:
+                sections, seconds = _assemble_page_ranges(pdf_paths[i], range_results.pop(i))
+            except Exception as e:
+                yield i, pdf_paths[i], [], 0.0, e
+                continue
+            yield i, pdf_paths[i], sections, seconds, None
+
+    # A worker that died outright (e.g. a crash inside the PDF parser) breaks the whole pool and
+    # fails every pending task. Retry those documents one at a time in their own process, so
+    # only the document that really crashes is lost.
+    for i in sorted(broken):
+        try:
+            with ProcessPoolExecutor(max_workers=1, initializer=_init_extraction_worker, initargs=worker_settings) as executor:
+                sections, seconds = executor.submit(_extract_sections_timed, pdf_paths[i]).result()
+            yield i, pdf_paths[i], sections, seconds, None
+        except Exception as e:
+            yield i, pdf_paths[i], [], 0.0, e
+
+def extract_documents(pdf_paths, max_workers=None):
+    """
+    Extracts sections from several PDFs, one document per task across a process pool.
+    
+    Args:
+        pdf_paths (list): Paths of the PDFs to extract.
+        max_workers (int, optional): Pool size. Defaults to one worker per CPU (capped at the
+            number of documents); 1 runs everything in the current process.
+        
+    Returns:
+        list: One (pdf_path, sections, seconds, error) tuple per input path, in input order.
+              `error` is None on success; a failed document has an empty section list.
+    """
+    results = [None] * len(pdf_paths)
+    for i, pdf_path, sections, seconds, error in iter_extracted_documents(pdf_paths, max_workers=max_workers):
+        results[i] = (pdf_path, sections, seconds, error)
+    return results
+
+def collection_pdf_paths(input_folder_abs, input_documents_list):
+    """Returns the paths of the listed PDFs that exist in the input folder, reporting missing ones."""
+    pdf_paths = []
+    for file_name in input_documents_list:
+        path = os.path.join(input_folder_abs, file_name)
+        if not os.path.exists(path):
+            print(f"Error: PDF file '{file_name}' not found at '{path}'. Skipping.")
+            continue
+        pdf_paths.append(path)
+    return pdf_paths
+
+def extract_collection(input_folder_abs, input_documents_list, extraction_workers=None):
+    """
+    Extracts sections from every listed PDF in the input folder.
+    Returns a flat list of section dicts: {'document', 'page_number', 'section_title', 'content'}.
+    """
+    all_extracted_sections = []
+    pdf_paths = collection_pdf_paths(input_folder_abs, input_documents_list)
+
+    # Documents are extracted in parallel across a process pool; results come back in input order.
+    print(f"Extracting sections from {len(pdf_paths)} documents...")
+    with tracing.span("extract_collection", documents=len(pdf_paths)) as trace_span:
+        for path, sections_for_file, seconds, error in extract_documents(pdf_paths, max_workers=extraction_workers):
+            file_name = os.path.basename(path)
+            tracing.record("extract_document", seconds, document=file_name, sections=len(sections_for_file),
+                           error=None if error is None else str(error))
+            if error is not None:
+                print(f"Error: Extraction failed for {file_name}: {error}. Skipping.")
+                continue
+            print(f"Extracted {len(sections_for_file)} sections from {file_name} in {round(seconds, 2)}s.")
+            all_extracted_sections.extend(sections_for_file)
+        trace_span.set(sections=len(all_extracted_sections))
+    return all_extracted_sections
+
+def iter_collection_sections(input_folder_abs, input_documents_list, whole_document='keep', chunk_pages=10):
+    """
+    Streams the sections of every listed PDF, one document after another, via iter_sections.
+    """
+    for file_name in input_documents_list:
+        path = os.path.join(input_folder_abs, file_name)
+        if not os.path.exists(path):
+            print(f"Error: PDF file '{file_name}' not found at '{path}'. Skipping.")
+            continue
+        print(f"Streaming sections from {file_name}...")
+        yield from iter_sections(path, whole_document=whole_document, chunk_pages=chunk_pages)
\ No newline at end of file
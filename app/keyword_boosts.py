@@ -0,0 +1,143 @@
+# app/keyword_boosts.py
+import json
+import os
+import re
+
+import numpy as np
+
+# Keyword boosts added to the cosine scores of sections. The table lives in a JSON file
+# (app/keyword_boosts.json by default, or KEYWORD_BOOSTS_FILE / --keyword-boosts):
+#
+#   keywords            {keyword: boost}; every keyword found in the section title or the
+#                       document name adds its boost (topics central to planning a trip score up,
+#                       background material such as history or introductions scores down)
+#   main_title_pattern  regex marking a title as a document's main title
+#   main_title_rules    for main titles, the first rule whose 'title_any' keyword is in the title
+#                       and whose 'document' keyword is in the document name adds its boost
+#
+# The table is compiled once into a single regex. Each position of a text is matched against
+# the longest keyword starting there (a lookahead, so overlapping keywords are all seen), and
+# every keyword contained in a matched one is implied by it, which together finds exactly the
+# keywords a substring check would. Document names and titles repeat (every section of a
+# document, headings like "Introduction", re-ranking the same collection in the server), so
+# their matches are memoized and each distinct text is matched only once. For many sections the
+# distinct matches become boolean keyword masks that are gathered per section, and the boosts are
+# summed column by column in table order, vectorized over the sections; that gives the same float
+# values as adding them one by one (benchmarks/check_keyword_boosts.py checks this against the
+# original per-section implementation).
+DEFAULT_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyword_boosts.json")
+MAX_MEMOIZED_TEXTS = 65536
+TITLE_SEPARATOR_PATTERN = re.compile(r'[\s\u2022\u2023\u25E6\u2043]+')
+
+_settings = {
+    "table_file": os.environ.get("KEYWORD_BOOSTS_FILE") or DEFAULT_TABLE_FILE,
+}
+_engine = None
+
+def configure(table_file=None):
+    """Sets the keyword table file; the engine is rebuilt from it on next use."""
+    global _engine
+    if table_file:
+        _settings["table_file"] = table_file
+        _engine = None
+
+def load_table(table_file):
+    """Reads a keyword table file, returning {'keywords', 'main_title_pattern', 'main_title_rules'}."""
+    with open(table_file, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    if not isinstance(table.get("keywords"), dict):
+        raise ValueError(f"Keyword table {table_file} needs a 'keywords' object of keyword -> boost")
+    return table
+
+def normalize_title(section_title):
+    return TITLE_SEPARATOR_PATTERN.sub(' ', section_title.lower()).strip()
+
+class KeywordBoostEngine:
+    def __init__(self, keywords, main_title_pattern=None, main_title_rules=()):
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.values = np.array(list(keywords.values()), dtype=np.float64)
+        keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        # Longest first, so the alternation takes the longest keyword at each position.
+        alternatives = sorted(keyword_index, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in alternatives) + "))") if alternatives else None
+        # Keyword -> indices of every keyword it contains (itself included).
+        self.implied = {keyword: frozenset(keyword_index[other] for other in keyword_index if other in keyword)
+                        for keyword in keyword_index}
+        self.main_title_pattern = re.compile(main_title_pattern) if main_title_pattern else None
+        self.main_title_rules = [(tuple(keyword.lower() for keyword in rule["title_any"]), rule["document"].lower(), float(rule["boost"]))
+                                 for rule in main_title_rules]
+        self._document_matches = {}
+        self._title_matches = {}
+
+    @classmethod
+    def from_file(cls, table_file):
+        table = load_table(table_file)
+        return cls(table["keywords"], table.get("main_title_pattern"), table.get("main_title_rules", ()))
+
+    def match(self, text):
+        """Returns the indices of the keywords occurring in an already lowercased text."""
+        if self.pattern is None:
+            return frozenset()
+        matched = set()
+        for found in set(self.pattern.findall(text)):
+            matched |= self.implied[found]
+        return frozenset(matched)
+
+    def document_match(self, document):
+        """Returns (lowercased name, keyword indices) for a document name, memoized per name."""
+        result = self._document_matches.get(document)
+        if result is None:
+            if len(self._document_matches) >= MAX_MEMOIZED_TEXTS:
+                self._document_matches.clear()
+            document_lower = document.lower()
+            result = self._document_matches[document] = (document_lower, self.match(document_lower))
+        return result
+
+    def title_match(self, section_title):
+        """Returns (normalized title, keyword indices, is main title) for a section title, memoized per title."""
+        result = self._title_matches.get(section_title)
+        if result is None:
+            if len(self._title_matches) >= MAX_MEMOIZED_TEXTS:
+                self._title_matches.clear()
+            title_lower = normalize_title(section_title)
+            is_main_title = self.main_title_pattern is not None and self.main_title_pattern.match(title_lower) is not None
+            result = self._title_matches[section_title] = (title_lower, self.match(title_lower), is_main_title)
+        return result
+
+    def _main_title_boost(self, title_lower, document_lower):
+        for title_any, document_keyword, boost in self.main_title_rules:
+            if any(keyword in title_lower for keyword in title_any) and document_keyword in document_lower:
+                return boost
+        return 0.0
+
+    def _masks(self, texts, match_fn):
+        # Distinct texts -> (row per text into the mask matrix, mask matrix, per-distinct match results).
+        distinct = {}
+        rows = np.fromiter((distinct.setdefault(text, len(distinct)) for text in texts), dtype=np.int64, count=len(texts))
+        results = [match_fn(text) for text in distinct]
+        masks = np.zeros((len(distinct), len(self.keywords)), dtype=bool)
+        for i, result in enumerate(results):
+            masks[i, list(result[1])] = True
+        return rows, masks, results
+
+    def boosts(self, section_titles, documents):
+        """Returns the boosts of sections given their titles and document names, as a float32 vector."""
+        title_rows, title_masks, title_results = self._masks(section_titles, self.title_match)
+        document_rows, document_masks, document_results = self._masks(documents, self.document_match)
+        matches = title_masks[title_rows] | document_masks[document_rows]
+
+        boosts = np.zeros(len(title_rows), dtype=np.float64)
+        for k in range(len(self.keywords)):
+            boosts += np.where(matches[:, k], self.values[k], 0.0)
+        # Main titles are rare, so their rules are checked per section.
+        main_titles = np.array([is_main_title for _, _, is_main_title in title_results], dtype=bool)
+        for i in np.flatnonzero(main_titles[title_rows]):
+            boosts[i] += self._main_title_boost(title_results[title_rows[i]][0], document_results[document_rows[i]][0])
+        return boosts.astype(np.float32)
+
+def get_engine():
+    """Returns the engine compiled from the configured keyword table, building it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = KeywordBoostEngine.from_file(_settings["table_file"])
+    return _engine
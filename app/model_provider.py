@@ -0,0 +1,151 @@
+# app/model_provider.py
+import os
+import threading
+import time
+
+import numpy as np
+
+from app import encoder_backends
+from app import tracing
+
+# Single place where the SentenceTransformer model is loaded. main.py, the ranker and the
+# summarizer all call get_model(), so the weights are held in memory exactly once and are
+# only loaded the first time something actually needs an embedding. The encoder backend
+# (PyTorch, int8-quantized PyTorch or an exported ONNX model) is chosen here as well.
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_settings = {
+    "model_name": os.environ.get("EMBEDDING_MODEL", DEFAULT_MODEL_NAME),
+    "device": os.environ.get("EMBEDDING_DEVICE") or None, # None lets sentence-transformers pick (cuda if available, else cpu)
+    "num_threads": int(os.environ["EMBEDDING_THREADS"]) if os.environ.get("EMBEDDING_THREADS") else None,
+    "batch_size": int(os.environ.get("EMBEDDING_BATCH_SIZE", 32)),
+    "backend": os.environ.get("EMBEDDING_BACKEND", "torch"),
+    "onnx_dir": os.environ.get("EMBEDDING_ONNX_DIR") or None, # Directory written by encoder_backends.export_onnx()
+}
+_model = None
+_model_lock = threading.Lock()
+_load_seconds = None
+
+def configure(model_name=None, device=None, num_threads=None, batch_size=None, backend=None, onnx_dir=None):
+    """
+    Sets the model name, device, torch thread count, encoder backend and ONNX model directory
+    used when the model is loaded, and the batch size used by encode_batched(). Model settings
+    must be configured before the first get_model() call to take effect.
+    """
+    if batch_size:
+        _settings["batch_size"] = int(batch_size)
+    if _model is not None:
+        print("ModelProvider: Model already loaded; configuration change ignored.")
+        return
+    if model_name:
+        _settings["model_name"] = model_name
+    if device:
+        _settings["device"] = device
+    if num_threads:
+        _settings["num_threads"] = int(num_threads)
+    if backend:
+        if backend not in encoder_backends.BACKENDS:
+            raise ValueError(f"Unknown encoder backend '{backend}'; expected one of {', '.join(encoder_backends.BACKENDS)}")
+        _settings["backend"] = backend
+    if onnx_dir:
+        _settings["onnx_dir"] = onnx_dir
+
+def get_model_name():
+    return _settings["model_name"]
+
+def get_backend_name():
+    """Identifies the backend and model, e.g. to keep cached embeddings of different backends apart."""
+    if _settings["backend"] == "onnx":
+        return f"onnx:{os.path.abspath(_settings['onnx_dir'] or '')}"
+    if _settings["backend"] == "torch":
+        return _settings["model_name"]
+    return f"{_settings['backend']}:{_settings['model_name']}"
+
+def get_batch_size():
+    return _settings["batch_size"]
+
+def get_model():
+    """
+    Returns the shared encoder (a SentenceTransformer, or an object with the same encode()
+    interface for the ONNX backend), loading it on first use.
+    """
+    global _model, _load_seconds
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None: # Another thread may have loaded it while we waited for the lock
+            start_time = time.time()
+            backend = _settings["backend"]
+            try:
+                if backend == "onnx":
+                    # onnxruntime has its own thread pool and doesn't need torch at all.
+                    threads = _settings["num_threads"] or "default"
+                else:
+                    # Imported here so processes that never embed anything don't pay the torch import either.
+                    import torch
+                    if _settings["num_threads"]:
+                        torch.set_num_threads(_settings["num_threads"])
+                    threads = torch.get_num_threads()
+                _model = encoder_backends.load_encoder(backend, _settings["model_name"], device=_settings["device"],
+                                                       onnx_dir=_settings["onnx_dir"], num_threads=_settings["num_threads"])
+            except Exception as e:
+                print(f"ModelProvider: Error loading {backend} encoder for {_settings['model_name']}: {e}. Ensure it's pre-downloaded.")
+                # This is a critical error, so re-raise as the system cannot function without it.
+                raise
+            _load_seconds = time.time() - start_time
+            tracing.record("model.load", _load_seconds, backend=get_backend_name())
+            print(f"ModelProvider: Loaded {get_backend_name()} on {_model.device} "
+                  f"(threads={threads}) in {round(_load_seconds, 2)}s.")
+    return _model
+
+def warm_up():
+    """
+    Loads the model and runs one small encode so the first real request doesn't pay
+    for lazy initialisation inside torch. Returns the total warm-up time in seconds.
+    """
+    start_time = time.time()
+    model = get_model()
+    model.encode(["warm-up"], show_progress_bar=False)
+    elapsed = time.time() - start_time
+    print(f"ModelProvider: Warm-up finished in {round(elapsed, 2)}s.")
+    return elapsed
+
+def get_load_seconds():
+    """Returns how long the model load took, or None if it hasn't been loaded yet."""
+    return _load_seconds
+
+def encode_batched(texts, batch_size=None):
+    """
+    Embeds a list of texts in batches and returns an (N, dim) float32 matrix of
+    L2-normalised embeddings, in the same order as `texts`.
+    Texts are bucketed by length before batching so each batch pads to a similar size,
+    which avoids wasting transformer compute on padding tokens.
+    """
+    model = get_model()
+    batch_size = batch_size or _settings["batch_size"]
+    embeddings = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if not texts:
+        return embeddings
+
+    # Length-sorted order; each batch then holds texts of similar length.
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch_texts = [texts[i] for i in batch_indices]
+        with tracing.span("model.encode", texts=len(batch_texts)) as trace_span:
+            if tracing.is_enabled():
+                # Tokens the model actually sees, and the padded total it computes over.
+                token_lengths = [len(ids) for ids in model.tokenizer(batch_texts, truncation=True,
+                                                                     max_length=model.max_seq_length)["input_ids"]]
+                trace_span.set(tokens=sum(token_lengths), padded_tokens=max(token_lengths) * len(token_lengths))
+                tracing.count("model.encode.tokens", sum(token_lengths))
+            tracing.count("model.encode.texts", len(batch_texts))
+            embeddings[batch_indices] = model.encode(
+                batch_texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+    return embeddings
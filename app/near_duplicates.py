@@ -0,0 +1,157 @@
+# app/near_duplicates.py
+import os
+import zlib
+
+import numpy as np
+
+from app import tracing
+from app.chunker import chunk_texts
+
+# Near-duplicate section filter, run before sections are embedded. Exact duplicates are already
+# dropped per document by the extractor; this catches sections that are almost the same (the
+# same boilerplate repeated across brochures, a heading block re-extracted with a few words
+# changed) anywhere in the collection, so they are neither encoded nor ranked.
+#
+# Each text becomes a set of word shingles (runs of `shingle_words` words, hashed with CRC32)
+# and a MinHash signature. The signature is cut into LSH bands; texts sharing a band are
+# candidates, and a candidate is a duplicate when the exact Jaccard similarity of the shingle
+# sets reaches the threshold. Texts are checked in order and the first of a group is kept, so
+# the result is deterministic. Jaccard is symmetric: the whole-document section, which contains
+# every granular section, is not a near-duplicate of any of them and is kept.
+#
+# The filter is off by default, because dropping sections changes which sections are ranked
+# and therefore the output. Enable it with --near-duplicate-filter or NEAR_DUPLICATE_FILTER=1.
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16 # 16 bands of 4 rows: pairs at Jaccard 0.8 become candidates with probability > 0.999
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_HASH_MASK = np.uint64(0xFFFFFFFF)
+_BLOCK_ROWS = 8192 # Shingles hashed per block, bounding the temporary (shingles x permutations) array
+
+_settings = {
+    "enabled": os.environ.get("NEAR_DUPLICATE_FILTER", "0") != "0",
+    "threshold": float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.9)),
+    "shingle_words": 3,
+}
+
+_random = np.random.RandomState(20240601) # Fixed, so signatures are identical across runs and processes
+_PERMUTATION_A = _random.randint(1, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERMUTATION_B = _random.randint(0, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+def configure(enabled=None, threshold=None, shingle_words=None):
+    """Enables/disables the filter, or sets the Jaccard threshold (0-1] and the shingle length in words."""
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if threshold is not None:
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Near-duplicate threshold must be in (0, 1], not {threshold}")
+        _settings["threshold"] = float(threshold)
+    if shingle_words:
+        _settings["shingle_words"] = int(shingle_words)
+
+def get_settings():
+    """Returns a copy of the current settings, e.g. to record what a saved index was built with."""
+    return dict(_settings)
+
+def is_enabled():
+    return _settings["enabled"]
+
+def shingle_hashes(text, shingle_words=None):
+    """Returns the sorted, unique CRC32 hashes of the text's lowercased word shingles."""
+    shingle_words = shingle_words or _settings["shingle_words"]
+    words = text.lower().split()
+    if len(words) <= shingle_words:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)]
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    return np.unique(hashes)
+
+def minhash_signature(hashes):
+    """Returns the MinHash signature (NUM_PERMUTATIONS uint64 values) of a set of 32-bit hashes."""
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), _BLOCK_ROWS):
+        block = hashes[start:start + _BLOCK_ROWS, None]
+        # a * x + b stays below 2**64 for 32-bit a, b and x, so the uint64 arithmetic is exact.
+        permuted = ((block * _PERMUTATION_A + _PERMUTATION_B) % _MERSENNE_PRIME) & _HASH_MASK
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+def jaccard(hashes_a, hashes_b):
+    """Exact Jaccard similarity of two sorted, unique hash arrays."""
+    intersection = len(np.intersect1d(hashes_a, hashes_b, assume_unique=True))
+    return intersection / (len(hashes_a) + len(hashes_b) - intersection)
+
+class NearDuplicateFilter:
+    """
+    Incremental filter: check() each text in order; texts that are not near-duplicates of an
+    earlier kept text are kept and indexed for the following checks.
+    """
+    def __init__(self, threshold=None, shingle_words=None):
+        self.threshold = threshold if threshold is not None else _settings["threshold"]
+        self.shingle_words = shingle_words or _settings["shingle_words"]
+        self.rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+        self.buckets = {}       # (band, band signature bytes) -> positions of kept texts
+        self.kept_shingles = [] # Shingle hashes of the kept texts, by position
+        self.checked = 0
+        self.skipped = 0
+        self.skipped_texts = [] # Texts skipped by check(), which callers then never embed
+
+    def check(self, text):
+        """Returns the position of an earlier kept near-duplicate of `text`, or None if `text` is kept."""
+        hashes = shingle_hashes(text, self.shingle_words)
+        position = self.check_shingles(hashes, minhash_signature(hashes))
+        if position is not None:
+            self.skipped_texts.append(text)
+        return position
+
+    def check_shingles(self, hashes, signature):
+        """Like check(), for a text's precomputed shingle_hashes() and minhash_signature()."""
+        self.checked += 1
+        band_keys = [(band, signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+                     for band in range(NUM_BANDS)]
+        seen = set()
+        for band_key in band_keys:
+            for position in self.buckets.get(band_key, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                if jaccard(hashes, self.kept_shingles[position]) >= self.threshold:
+                    self.skipped += 1
+                    return position
+
+        position = len(self.kept_shingles)
+        self.kept_shingles.append(hashes)
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, []).append(position)
+        return None
+
+    def report(self):
+        """
+        Prints how many sections were skipped and how many texts (chunks of the skipped sections)
+        that kept from the encoder, and records both as trace counters. Sections skipped through
+        check_shingles() were already embedded, so they save no encodes.
+        """
+        texts_not_encoded = len(chunk_texts(self.skipped_texts)[0]) if self.skipped_texts else 0
+        tracing.count("near_duplicates.skipped", self.skipped)
+        tracing.count("near_duplicates.texts_not_encoded", texts_not_encoded)
+        print(f"NearDuplicates: Skipped {self.skipped} of {self.checked} sections as near-duplicates "
+              f"(Jaccard >= {self.threshold}); {texts_not_encoded} texts not sent to the encoder.")
+
+def keep_mask(texts, threshold=None):
+    """
+    Returns a boolean array marking the texts to keep: every text when the filter is disabled,
+    otherwise all but the near-duplicates of an earlier text.
+    """
+    if not _settings["enabled"] or not texts:
+        return np.ones(len(texts), dtype=bool)
+    with tracing.span("near_duplicates", texts=len(texts)):
+        duplicate_filter = NearDuplicateFilter(threshold=threshold)
+        mask = np.array([duplicate_filter.check(text) is None for text in texts], dtype=bool)
+        duplicate_filter.report()
+    return mask
+
+def drop_near_duplicates(sections_data, threshold=None):
+    """Returns the section dicts that are not near-duplicates of an earlier one, in order."""
+    sections_data = list(sections_data)
+    mask = keep_mask([section_dict['content'] for section_dict in sections_data], threshold=threshold)
+    return [section_dict for section_dict, keep in zip(sections_data, mask) if keep]
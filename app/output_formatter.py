@@ -1,5 +1,16 @@
 # app/output_formatter.py
 import os
+import time
+
+from app.summarizer import summarize_sections
+from app.persona_analyzer import encode_queries
+from app.embedding_cache import encode_texts
+
+# Default persona and job descriptions for fallback if input_config.json is missing or malformed
+DEFAULT_PERSONA = "General Analyst"
+DEFAULT_JOB = "Extract key information from documents."
+# The challenge's sample output typically shows a fixed number of top sections (e.g., 5).
+NUM_TOP_SECTIONS_TO_OUTPUT = 5
 
 def get_pdf_files(input_folder):
     """
@@ -7,4 +18,80 @@ def get_pdf_files(input_folder):
     """
     pdf_files = [f for f in os.listdir(input_folder) if f.lower().endswith('.pdf')]
     pdf_files.sort() # Ensure consistent order
-    return pdf_files
\ No newline at end of file
+    return pdf_files
+
+def parse_config(config_data):
+    """
+    Reads (persona, job, document filenames) from an input_config.json-style dict,
+    falling back to the defaults for anything missing.
+    """
+    persona_desc = config_data.get('persona', {}).get('description', DEFAULT_PERSONA)
+    job_desc = config_data.get('job_to_be_done', {}).get('task', DEFAULT_JOB)
+    input_documents_list = [doc['filename'] for doc in config_data.get('documents', [])]
+    return persona_desc, job_desc, input_documents_list
+
+def build_output(store, ranked_section_ids, persona_desc, job_desc, input_documents_list,
+                 query_embedding=None, encode_fn=None):
+    """
+    Builds the result JSON structure (metadata, top extracted sections and their refined summaries)
+    from the globally ranked section ids. `store` is the SectionStore (or SectionIndex) the ids refer
+    to; sections are fetched from it by id. `query_embedding` is the ranking query embedding, reused
+    for summarization. `encode_fn` optionally replaces the embedding function used for summarization;
+    it must behave like embedding_cache.encode_texts.
+    """
+    # --- Step 3: Populate 'extracted_sections' for output (top N globally ranked sections) ---
+    final_extracted_sections_for_output = []
+    top_sections = [store.section(int(section_id)) for section_id in ranked_section_ids[:NUM_TOP_SECTIONS_TO_OUTPUT]]
+    
+    # Iterate through the globally ranked sections and pick the top N
+    for i, section_dict in enumerate(top_sections):
+        final_extracted_sections_for_output.append({
+            "document": section_dict['document'],
+            "page_number": section_dict['page_number'],
+            "section_title": section_dict['section_title'],
+            "importance_rank": i + 1 # Assign a global rank (1 to N)
+        })
+    
+    # --- Step 4: Generate 'sub_section_analysis' ('refined_text') for the selected top sections ---
+    sub_section_analysis_results = []
+    
+    if encode_fn is None:
+        encode_fn = encode_texts
+    # Reuse the ranking query embedding so summaries are scored against the same query as the sections.
+    if query_embedding is None:
+        query_embedding = encode_queries([(persona_desc, job_desc)])[0]
+
+    # The full content of each selected section comes straight from the store by id, so the
+    # summary is always of the exact section that was ranked, even when titles and pages repeat.
+    sections_to_summarize = []
+    for section_data_in_output, section_dict in zip(final_extracted_sections_for_output, top_sections):
+        full_content_for_summary = section_dict['content']
+        if full_content_for_summary.strip(): # Only summarize if content exists
+            print(f"Summarizing section: {section_data_in_output['section_title']} from {section_data_in_output['document']} (Page {section_data_in_output['page_number']})...")
+            sections_to_summarize.append((section_data_in_output, full_content_for_summary))
+
+    # Use query-based summarization to make refined text persona-relevant
+    # You can adjust `num_sentences` here for shorter/longer summaries
+    refined_texts = summarize_sections([content for _, content in sections_to_summarize], num_sentences=7,
+                                       query_embedding=query_embedding, encode_fn=encode_fn)
+    for (section_data_in_output, _), refined_text in zip(sections_to_summarize, refined_texts):
+        sub_section_analysis_results.append({
+            "document": section_data_in_output['document'],
+            "refined_text": refined_text,
+            "page_number": section_data_in_output['page_number']
+        })
+    
+    # Sort sub_section_analysis results by document name then page number for consistent output
+    sub_section_analysis_results.sort(key=lambda x: (x['document'], x['page_number']))
+
+    # --- Final Output Construction ---
+    return {
+        "metadata": {
+            "input_documents": input_documents_list,
+            "persona": persona_desc,
+            "job_to_be_done": job_desc,
+            "processing_timestamp": time.strftime("%Y-%m-%d %H:%M:%S") # Generate current timestamp
+        },
+        "extracted_sections": final_extracted_sections_for_output,
+        "sub_section_analysis": sub_section_analysis_results
+    }
\ No newline at end of file
@@ -0,0 +1,133 @@
+# app/pdf_backends.py
+import importlib.util
+import os
+
+# PDF text backends behind the extractor. Every backend reads the text of a PDF page by page
+# through the same two calls, page_count() and read_pages(), so the section splitter works on
+# any of them. The faster parsers are optional and only used when installed; PyPDF2 is a hard
+# dependency and always the fallback.
+#
+#   pymupdf    PyMuPDF ("fitz"), MuPDF's C text extractor - usually by far the fastest
+#   pypdfium2  PDFium's text extractor
+#   pypdf2     PyPDF2, pure Python (default fallback)
+#
+# 'auto' picks the first installed backend in that order. Backends do not produce identical
+# text (line breaks and spacing differ), so sections can differ between them; the extraction
+# cache keeps their results apart, and benchmarks/bench_pdf_backends.py compares them.
+BACKENDS = ("pymupdf", "pypdfium2", "pypdf2")
+
+_settings = {
+    "backend": os.environ.get("PDF_BACKEND", "auto"),
+    # Documents with more pages than this are read as several page ranges in parallel when
+    # extracting a collection across the process pool; 0 disables the split.
+    "page_range_size": int(os.environ.get("PDF_PAGE_RANGE_SIZE", 50)),
+}
+
+def configure(backend=None, page_range_size=None):
+    """Sets the PDF backend ('auto' or one of BACKENDS) and the page range size used for splitting."""
+    if backend:
+        if backend != "auto" and backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend '{backend}'; expected 'auto' or one of {', '.join(BACKENDS)}")
+        _settings["backend"] = backend
+    if page_range_size is not None:
+        _settings["page_range_size"] = max(0, int(page_range_size))
+
+def get_settings():
+    """Returns a copy of the current settings, e.g. to re-apply them in worker processes."""
+    return dict(_settings)
+
+def get_page_range_size():
+    return _settings["page_range_size"]
+
+class PyPDF2Backend:
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def page_count(self, pdf_path):
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def read_pages(self, pdf_path, start=0, stop=None):
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            for page_idx in range(start, len(reader.pages) if stop is None else min(stop, len(reader.pages))):
+                yield reader.pages[page_idx].extract_text() or ""
+
+class PyMuPDFBackend:
+    name = "pymupdf"
+    module = "fitz"
+
+    def page_count(self, pdf_path):
+        import fitz
+        with fitz.open(pdf_path) as document:
+            return document.page_count
+
+    def read_pages(self, pdf_path, start=0, stop=None):
+        import fitz
+        with fitz.open(pdf_path) as document:
+            for page_idx in range(start, document.page_count if stop is None else min(stop, document.page_count)):
+                yield document[page_idx].get_text() or ""
+
+class PdfiumBackend:
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def page_count(self, pdf_path):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def read_pages(self, pdf_path, start=0, stop=None):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for page_idx in range(start, len(document) if stop is None else min(stop, len(document))):
+                page = document[page_idx]
+                text_page = page.get_textpage()
+                # PDFium separates lines with CRLF; the splitter works on '\n'.
+                yield (text_page.get_text_range() or "").replace('\r\n', '\n')
+                text_page.close()
+                page.close()
+        finally:
+            document.close()
+
+_BACKEND_CLASSES = {backend_class.name: backend_class for backend_class in (PyMuPDFBackend, PdfiumBackend, PyPDF2Backend)}
+_instances = {}
+
+def is_available(name):
+    return importlib.util.find_spec(_BACKEND_CLASSES[name].module) is not None
+
+def available_backends():
+    """Returns the installed backends, in 'auto' preference order."""
+    return [name for name in BACKENDS if is_available(name)]
+
+def get_backend(name=None):
+    """
+    Returns the backend called `name` (default: the configured one). 'auto' resolves to the first
+    installed backend in BACKENDS order.
+    """
+    name = name or _settings["backend"]
+    backend = _instances.get(name)
+    if backend is None:
+        if name == "auto":
+            resolved_name = next(backend_name for backend_name in BACKENDS if is_available(backend_name))
+        elif is_available(name):
+            resolved_name = name
+        else:
+            raise ImportError(f"PDF backend '{name}' needs the '{_BACKEND_CLASSES[name].module}' package, which is not installed.")
+        backend = _instances[name] = _BACKEND_CLASSES[resolved_name]()
+    return backend
+
+def get_backend_name():
+    """Name of the backend in use, e.g. to keep extraction cache entries of different backends apart."""
+    return get_backend().name
+
+def page_ranges(page_count, range_size=None):
+    """Splits `page_count` pages into [start, stop) ranges of at most `range_size` pages."""
+    range_size = range_size or _settings["page_range_size"] or max(page_count, 1)
+    return [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
@@ -1,111 +1,156 @@
 # app/persona_analyzer.py
-from sentence_transformers import SentenceTransformer, util
-import torch
-import re # Added for cleaning in boost logic
+import heapq
+import itertools
+import numpy as np
 
-model_name = 'all-MiniLM-L6-v2'
-try:
-    model = SentenceTransformer(model_name)
-    print(f"Loaded SentenceTransformer model for ranking: {model_name}")
-except Exception as e:
-    print(f"Error loading SentenceTransformer model {model_name}: {e}. Please ensure it's pre-downloaded or available.")
-    raise
+from app import near_duplicates
+from app import tracing
+from app.chunker import encode_sections, pool_chunk_scores
+from app.embedding_cache import encode_texts
+from app.keyword_boosts import get_engine as get_boost_engine
+from app.model_provider import get_batch_size
 
-def rank_sections(sections_data, persona, job):
+def build_query_text(persona, job):
+    return f"Persona: {persona}. Job to be done: {job}."
+
+def encode_queries(persona_job_pairs):
     """
-    Ranks extracted sections based on relevance to persona and job description
-    using SentenceTransformers for semantic similarity, with generic boosting.
-    
-    Args:
-        sections_data (list): List of dictionaries, each with 'document', 'page_number', 'content', 'section_title'.
-        persona (str): Persona description.
-        job (str): Job-to-be-done description.
-        
-    Returns:
-        list: Sorted list of (relevance_score, original_section_dict) tuples.
+    Returns the normalised query embeddings (queries x dim) used for ranking. The same
+    embeddings are reused for query-focused summarization.
     """
-    if not sections_data:
-        return []
+    return encode_texts([build_query_text(persona, job) for persona, job in persona_job_pairs])
 
-    query_text = f"Persona: {persona}. Job to be done: {job}."
-    query_embedding = model.encode(query_text, convert_to_tensor=True)
+def compute_boosts(sections_data):
+    """Returns the keyword boosts of all sections as a float32 vector."""
+    return get_boost_engine().boosts([section_dict['section_title'] for section_dict in sections_data],
+                                     [section_dict['document'] for section_dict in sections_data])
 
-    ranked_sections_with_score = []
+def compute_store_boosts(store, section_ids):
+    """Returns the keyword boosts of the given SectionStore ids as a float32 vector."""
+    section_ids = np.asarray(section_ids).tolist()
+    return get_boost_engine().boosts([store.section_title(section_id) for section_id in section_ids],
+                                     [store.document(section_id) for section_id in section_ids])
 
-    for section_dict in sections_data:
-        section_text = section_dict['content']
-        if not section_text.strip(): # Skip empty content sections
-            continue
+def score_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner=None):
+    """
+    Scores precomputed, normalised query embeddings (queries x dim) against section embeddings
+    (sections x dim) plus the per-section boosts. If `chunk_owner` is given (from
+    chunker.encode_sections), `section_embeddings` holds one row per chunk and the chunk
+    scores are pooled back to their sections. Every ranking path scores through this.
+    
+    Returns:
+        np.ndarray: (queries, sections) scores, clipped to [0.0, 1.0].
+    """
+    # Embeddings are L2-normalised, so the dot products are cosine similarities.
+    cosine_scores = query_embeddings @ section_embeddings.T # (queries, sections or chunks)
+    if chunk_owner is not None:
+        cosine_scores = pool_chunk_scores(cosine_scores, chunk_owner, len(boosts))
+    # Ensure score stays within reasonable bounds [0.0, 1.0]
+    return np.clip(cosine_scores + boosts, 0.0, 1.0)
 
-        section_embedding = model.encode(section_text, convert_to_tensor=True)
-        cosine_score = util.pytorch_cos_sim(query_embedding, section_embedding).item()
-        
-        # --- Generic Boosting Strategy based on likely relevant keywords/phrases ---
-        # This enhances ranking for common relevant topics without hardcoding specific PDF names.
-        
-        # Cleaned title for better matching
-        title_lower = section_dict['section_title'].lower()
-        title_lower = re.sub(r'[\s\u2022\u2023\u25E6\u2043]+', ' ', title_lower).strip()
+def rank_ids_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner=None):
+    """
+    Scores like score_with_embeddings() and sorts the sections per query.
+    
+    Returns:
+        list: One (positions, scores) pair of arrays per query, best first. Positions index the
+              rows of `boosts`; ties keep their original order.
+    """
+    final_scores = score_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner)
 
-        doc_lower = section_dict['document'].lower()
+    ranked_per_query = []
+    for query_scores in final_scores:
+        order = np.argsort(-query_scores, kind='stable')
+        ranked_per_query.append((order, query_scores[order]))
+    return ranked_per_query
 
-        # Define keywords and associated boost values
-        # Positive boosts for elements central to planning/experience
-        relevant_keywords = {
-            "cities": 0.08,             # High relevance for destination
-            "things to do": 0.10,       # Core activities
-            "activities": 0.10,
-            "experiences": 0.09,
-            "coastal adventures": 0.12, # Specific to South of France, highly engaging
-            "nightlife and entertainment": 0.15, # Very high relevance for college friends
-            "restaurants": 0.07,
-            "cuisine": 0.07,
-            "culinary experiences": 0.09,
-            "wine tasting": 0.06,       # Social activity
-            "packing": 0.05,            # Practical planning
-            "tips and tricks": 0.06,    # Practical planning
-            "travel tips": 0.06,
-            "water sports": 0.12,       # Engaging activity
-            "hotels": 0.03,             # Important for accommodation but possibly less direct for "plan a trip of activities"
-            "shopping and markets": 0.04, # Group activity
-            "outdoor activities": 0.08,
-            "family-friendly": -0.10,   # Negative boost if "college friends" (adults) is emphasized
-            "history": -0.05,           # Less priority for "college friends trip" (unless specified)
-            "traditions and culture": -0.03, # Less priority for a quick fun trip (unless specified)
-            "conclusion": -0.02,        # Usually summaries, less new info
-            "introduction": -0.01       # Less specific content
-        }
+def rank_sections(store, persona_job_pairs, section_ids=None, batch_size=None, query_embeddings=None):
+    """
+    Ranks sections held in a SectionStore for one or more (persona, job) queries.
+    `section_ids` restricts ranking to those ids (default: every section with content).
+    With the near-duplicate filter enabled, near-duplicates of earlier sections are dropped
+    before embedding (see app.near_duplicates).
+    
+    Returns:
+        list: One (section_ids, scores) pair of arrays per query, best first.
+    """
+    if section_ids is None:
+        section_ids = store.ids_with_content()
+    if len(section_ids) == 0 or not persona_job_pairs:
+        return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in persona_job_pairs]
 
-        # Apply boosts based on section title or document name
-        for keyword, boost_value in relevant_keywords.items():
-            if keyword in title_lower or keyword in doc_lower:
-                cosine_score += boost_value
-        
-        # Special handling for main document titles (often indicate high-level relevance)
-        # Check if the title is likely a main document title.
-        # This regex attempts to catch common main document title patterns
-        if re.match(r"(?:comprehensive|ultimate|a culinary journey|a historical journey|a comprehensive guide).*", title_lower):
-             # And if the title also contains a key domain word
-             if "cities" in title_lower and "cities" in doc_lower:
-                 cosine_score += 0.15
-             elif ("things to do" in title_lower or "activities" in title_lower) and "things to do" in doc_lower:
-                 cosine_score += 0.15
-             elif "cuisine" in title_lower and "cuisine" in doc_lower:
-                 cosine_score += 0.10
-             elif "restaurants and hotels" in title_lower and "restaurants and hotels" in doc_lower:
-                 cosine_score += 0.08 # Slightly lower boost for this as main doc for "college friends"
-             elif "tips and tricks" in title_lower and "tips and tricks" in doc_lower:
-                 cosine_score += 0.10 # Good for planning
-             elif "history" in title_lower and "history" in doc_lower:
-                 cosine_score += 0.01 # Very slight positive, but still less than activities
-             elif "traditions and culture" in title_lower and "traditions and culture" in doc_lower:
-                 cosine_score += 0.01 # Very slight positive
+    section_ids = section_ids[near_duplicates.keep_mask([store.content(section_id) for section_id in section_ids.tolist()])]
+    with tracing.span("rank_sections", sections=len(section_ids), queries=len(persona_job_pairs)) as trace_span:
+        if query_embeddings is None:
+            query_embeddings = encode_queries(persona_job_pairs)
+        # Served from the persistent embedding cache where possible; only unseen sections are encoded.
+        # Sections longer than the model window are embedded as overlapping chunks.
+        section_embeddings, chunk_owner = encode_sections([store.content(section_id) for section_id in section_ids.tolist()],
+                                                          batch_size=batch_size)
+        trace_span.set(chunks=len(section_embeddings))
+        boosts = compute_store_boosts(store, section_ids)
+        return [(section_ids[order], scores)
+                for order, scores in rank_ids_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner)]
 
-        # Ensure score stays within reasonable bounds [0.0, 1.0]
-        cosine_score = max(0.0, min(1.0, cosine_score))
-        
-        ranked_sections_with_score.append((cosine_score, section_dict))
+def rank_sections_with_index(index, persona, job, candidate_k=100, mode='exact', n_probe=8, query_embedding=None):
+    """
+    Ranks sections held in a SectionIndex. Only the `candidate_k` sections with the highest
+    cosine similarity are retrieved (exactly, or approximately with mode='ivf'), and only those
+    candidates go through the keyword boost logic.
+    
+    Returns:
+        tuple: (section_ids, scores) arrays for the candidates, best first. Fetch the sections
+               with index.section(section_id).
+    """
+    if len(index) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    if query_embedding is None:
+        query_embedding = encode_queries([(persona, job)])[0]
+    with tracing.span("index.search", mode=mode, candidates=candidate_k, indexed=len(index)):
+        section_ids, _ = index.search(query_embedding, k=candidate_k, mode=mode, n_probe=n_probe)
+    # Back into collection order, so ties after clipping break the same way as in rank_sections().
+    section_ids = np.sort(section_ids)
+    candidates = [index.section(int(section_id)) for section_id in section_ids]
+    candidate_embeddings, chunk_owner = index.vectors(section_ids)
+    order, scores = rank_ids_with_embeddings(np.asarray(query_embedding)[None, :], candidate_embeddings, compute_boosts(candidates),
+                                             chunk_owner)[0]
+    return section_ids[order], scores
 
-    ranked_sections_with_score.sort(key=lambda x: x[0], reverse=True)
+def rank_section_stream(section_iter, persona, job, top_k=50, batch_size=None, query_embedding=None):
+    """
+    Ranks a stream of sections (e.g. from extractor.iter_sections) in bounded memory. Sections are
+    pulled from the iterator one encode batch at a time, so extraction never runs more than one
+    batch ahead of the encoder, and only the `top_k` best-scoring sections are kept.
     
-    return ranked_sections_with_score
\ No newline at end of file
+    Returns:
+        list: Sorted list of at most `top_k` (relevance_score, section_dict) tuples.
+    """
+    if query_embedding is None:
+        query_embedding = encode_queries([(persona, job)])[0]
+    batch_size = batch_size or get_batch_size()
+
+    top_heap = [] # (score, -arrival_order, section_dict); the smallest score is evicted first
+    arrival_order = itertools.count()
+    section_iter = (section_dict for section_dict in section_iter if section_dict['content'].strip())
+    duplicate_filter = near_duplicates.NearDuplicateFilter() if near_duplicates.is_enabled() else None
+    if duplicate_filter is not None:
+        # Checked as the sections stream in, so only earlier sections count as originals.
+        section_iter = (section_dict for section_dict in section_iter if duplicate_filter.check(section_dict['content']) is None)
+    while True:
+        batch = list(itertools.islice(section_iter, batch_size))
+        if not batch:
+            break
+        tracing.count("rank_section_stream.sections", len(batch))
+        section_embeddings, chunk_owner = encode_sections([section_dict['content'] for section_dict in batch], batch_size=batch_size)
+        scores = score_with_embeddings(query_embedding[None, :], section_embeddings, compute_boosts(batch), chunk_owner)[0]
+        for score, section_dict in zip(scores, batch):
+            # Earlier sections win ties, matching the stable sort in rank_ids_with_embeddings().
+            entry = (float(score), -next(arrival_order), section_dict)
+            if len(top_heap) < top_k:
+                heapq.heappush(top_heap, entry)
+            elif entry[:2] > top_heap[0][:2]:
+                heapq.heapreplace(top_heap, entry)
+
+    if duplicate_filter is not None:
+        duplicate_filter.report()
+    return [(score, section_dict) for score, _, section_dict in sorted(top_heap, key=lambda entry: entry[:2], reverse=True)]
\ No newline at end of file
@@ -0,0 +1,189 @@
+# app/pipeline.py
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from app import near_duplicates
+from app import tracing
+from app.chunker import encode_sections
+from app.extractor import collection_pdf_paths, iter_extracted_documents
+from app.persona_analyzer import compute_store_boosts, encode_queries, rank_ids_with_embeddings
+from app.section_store import SectionStore
+
+# Pipelined extraction and embedding. Documents are parsed across the extraction process pool
+# and each one is handed to the embedding worker thread through a bounded queue as soon as it
+# finishes, so the encoder works on finished documents while later ones are still being parsed.
+# The embedding worker loads the model and embeds the queries first, which overlaps the model
+# load with extraction as well. Ranking needs every section, so it runs once the queue drains.
+#
+# There is a single embedding worker on purpose: there is only one model, and torch already
+# spreads each encode over its own threads. Documents reach the worker in the order they finish
+# parsing, so it cannot drop near-duplicate sections itself (which copy is kept would depend on
+# that order): it embeds every section and computes their shingles, and the near-duplicate
+# filter runs over the shingles in collection order once the queue drains, like in the
+# sequential path. The rows of dropped sections are then left out of the ranking.
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("PIPELINE_QUEUE_DEPTH", 4))
+
+class StageClock:
+    """Records busy intervals per pipeline stage, to report how much the stages overlapped."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.intervals = {} # stage -> list of (start, end) offsets in seconds
+        self.lock = threading.Lock()
+
+    def add(self, stage, start, end):
+        with self.lock:
+            self.intervals.setdefault(stage, []).append((start - self.start, end - self.start))
+
+    def report(self):
+        """
+        Returns {'wall_s', 'busy_s', 'overlap_s', 'stages'}: the wall time from the first to the
+        last busy interval, the summed busy time of all stages, and how much of that ran concurrently.
+        """
+        with self.lock:
+            intervals = {stage: list(stage_intervals) for stage, stage_intervals in self.intervals.items()}
+        stages = {}
+        for stage, stage_intervals in intervals.items():
+            stages[stage] = {
+                "busy_s": round(sum(end - start for start, end in stage_intervals), 4),
+                "first_start_s": round(min(start for start, _ in stage_intervals), 4),
+                "last_end_s": round(max(end for _, end in stage_intervals), 4),
+                "items": len(stage_intervals),
+            }
+        all_intervals = [interval for stage_intervals in intervals.values() for interval in stage_intervals]
+        wall = max(end for _, end in all_intervals) - min(start for start, _ in all_intervals) if all_intervals else 0.0
+        busy = sum(stage["busy_s"] for stage in stages.values())
+        return {"wall_s": round(wall, 4), "busy_s": round(busy, 4), "overlap_s": round(max(0.0, busy - wall), 4), "stages": stages}
+
+def _embedding_worker(document_queue, persona_job_pairs, clock, results, batch_size):
+    try:
+        start = time.perf_counter()
+        results["query_embeddings"] = encode_queries(persona_job_pairs) # Loads the model on first use
+        clock.add("model_load_and_queries", start, time.perf_counter())
+        while True:
+            item = document_queue.get()
+            if item is None:
+                break
+            position, sections = item
+            start = time.perf_counter()
+            texts = [section_dict['content'] for section_dict in sections if section_dict['content'].strip()]
+            shingles = None
+            if near_duplicates.is_enabled():
+                shingles = []
+                for text in texts:
+                    hashes = near_duplicates.shingle_hashes(text)
+                    shingles.append((hashes, near_duplicates.minhash_signature(hashes)))
+            results["documents"][position] = (*encode_sections(texts, batch_size=batch_size), shingles)
+            clock.add("embed", start, time.perf_counter())
+    except BaseException as e:
+        results["error"] = e
+        # Keep draining so the producer never blocks on a full queue.
+        while document_queue.get() is not None:
+            pass
+
+def run_pipeline(input_folder_abs, input_documents_list, persona_job_pairs, extraction_workers=None,
+                 queue_depth=None, batch_size=None):
+    """
+    Extracts, embeds and ranks a collection with extraction and embedding overlapped.
+
+    Args:
+        input_folder_abs (str): Folder holding the PDFs.
+        input_documents_list (list): PDF file names, in collection order.
+        persona_job_pairs (list): (persona, job) queries to rank for.
+        extraction_workers (int, optional): Extraction processes (default: one per CPU).
+        queue_depth (int, optional): Parsed documents allowed to wait for the embedding worker;
+            extraction results beyond that are held back. Defaults to PIPELINE_QUEUE_DEPTH or 4.
+        batch_size (int, optional): Encode batch size.
+
+    Returns:
+        tuple: (section_store, ranked_per_query, query_embeddings, stage_report). `ranked_per_query`
+               holds one (section_ids, scores) pair per query, as from rank_sections, and
+               `stage_report` is StageClock.report().
+    """
+    pdf_paths = collection_pdf_paths(input_folder_abs, input_documents_list)
+    queue_depth = queue_depth or DEFAULT_QUEUE_DEPTH
+    document_queue = queue.Queue(maxsize=queue_depth)
+    clock = StageClock()
+    results = {"documents": {}, "query_embeddings": None, "error": None}
+    worker = threading.Thread(target=_embedding_worker, name="pipeline-embedding",
+                              args=(document_queue, persona_job_pairs, clock, results, batch_size), daemon=True)
+    worker.start()
+
+    print(f"Extracting sections from {len(pdf_paths)} documents (pipelined, queue depth {queue_depth})...")
+    sections_per_document = [[] for _ in pdf_paths]
+    try:
+        with tracing.span("pipeline.extract", documents=len(pdf_paths)):
+            for position, path, sections, seconds, error in iter_extracted_documents(pdf_paths, max_workers=extraction_workers):
+                file_name = os.path.basename(path)
+                # Worker-measured parse time, ending now.
+                finished = time.perf_counter()
+                clock.add("extract", finished - seconds, finished)
+                tracing.record("extract_document", seconds, document=file_name, sections=len(sections),
+                               error=None if error is None else str(error))
+                if error is not None:
+                    print(f"Error: Extraction failed for {file_name}: {error}. Skipping.")
+                    continue
+                print(f"Extracted {len(sections)} sections from {file_name} in {round(seconds, 2)}s.")
+                sections_per_document[position] = sections
+                document_queue.put((position, sections)) # Blocks while the queue is full
+    finally:
+        document_queue.put(None)
+        worker.join()
+    if results["error"] is not None:
+        raise results["error"]
+
+    # Assemble everything in collection order, so ranking ties break exactly as in the sequential path.
+    with tracing.span("pipeline.rank", queries=len(persona_job_pairs)):
+        start = time.perf_counter()
+        section_store = SectionStore()
+        duplicate_filter = near_duplicates.NearDuplicateFilter() if near_duplicates.is_enabled() else None
+        section_ids = []
+        embeddings = []
+        chunk_owners = []
+        for position, sections in enumerate(sections_per_document):
+            document_range = section_store.extend(sections)
+            if position not in results["documents"]:
+                continue
+            document_embeddings, chunk_owner, shingles = results["documents"][position]
+            # Same content filter as the embedding worker, so ids and embedding rows line up.
+            document_ids = np.array([section_id for section_id in document_range if section_store.content(section_id).strip()],
+                                    dtype=np.int64)
+            if chunk_owner is None:
+                chunk_owner = np.arange(len(document_ids))
+            if duplicate_filter is not None:
+                keep = np.array([duplicate_filter.check_shingles(hashes, signature) is None for hashes, signature in shingles],
+                                dtype=bool)
+                if not keep.all():
+                    # Drop the rows of near-duplicates and renumber the owners of the remaining chunks.
+                    kept_chunks = keep[chunk_owner]
+                    document_embeddings = document_embeddings[kept_chunks]
+                    chunk_owner = (np.cumsum(keep) - 1)[chunk_owner[kept_chunks]]
+                    document_ids = document_ids[keep]
+            chunk_owners.append(chunk_owner + len(section_ids))
+            section_ids.extend(document_ids.tolist())
+            embeddings.append(document_embeddings)
+
+        if duplicate_filter is not None:
+            duplicate_filter.report()
+        section_ids = np.array(section_ids, dtype=np.int64)
+        query_embeddings = results["query_embeddings"]
+        if len(section_ids) == 0:
+            ranked_per_query = [(section_ids, np.zeros(0, dtype=np.float32)) for _ in persona_job_pairs]
+        else:
+            section_embeddings = np.concatenate(embeddings)
+            chunk_owner = np.concatenate(chunk_owners)
+            if len(chunk_owner) == len(section_ids):
+                chunk_owner = None # Nothing was chunked
+            boosts = compute_store_boosts(section_store, section_ids)
+            ranked_per_query = [(section_ids[order], scores)
+                                for order, scores in rank_ids_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner)]
+        clock.add("rank", start, time.perf_counter())
+
+    stage_report = clock.report()
+    stage_summary = ", ".join(f"{stage} {stats['busy_s']:.2f}s" for stage, stats in stage_report["stages"].items())
+    print(f"Pipeline: {stage_summary}; {stage_report['busy_s']:.2f}s of stage time in {stage_report['wall_s']:.2f}s wall "
+          f"({stage_report['overlap_s']:.2f}s overlapped).")
+    return section_store, ranked_per_query, query_embeddings, stage_report
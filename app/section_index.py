@@ -0,0 +1,260 @@
+# app/section_index.py
+import json
+import os
+
+import numpy as np
+
+from app import chunker
+from app import model_provider
+from app import near_duplicates
+from app import pdf_backends
+from app.chunker import encode_sections, pool_chunk_scores
+
+# Persistent vector index over extracted sections, for corpora too large to brute-force score
+# every section per query. Embeddings live in one contiguous matrix (float32, or int8 with a
+# per-row scale), with the section metadata kept in parallel arrays. Search is exact by default;
+# an IVF (inverted file) mode clusters the embeddings with k-means and only scores the sections
+# in the `n_probe` clusters closest to the query.
+#
+# Long sections are chunked like in the other ranking paths: the matrix then holds one row per
+# chunk, `chunk_owner` maps rows to sections, and search pools the row scores of each section.
+# IVF lists hold rows, so a section is found through whichever of its chunks are probed.
+#
+# metadata.json also records what the index was built from (see build_info()): the encoder,
+# the embedding dimension, the extraction and filter settings, whether it is quantized, and
+# every document with its size and mtime. An index whose build info no longer matches the
+# current run is stale and must be rebuilt.
+INDEX_FORMAT_VERSION = 2
+
+def build_info(input_folder_abs, input_documents_list, quantize=False):
+    """
+    Returns what an index built now from the listed documents depends on, as stored in its
+    metadata. Documents missing from the input folder are recorded with no size or mtime.
+    """
+    documents = []
+    for file_name in input_documents_list:
+        try:
+            stat = os.stat(os.path.join(input_folder_abs, file_name))
+            documents.append([file_name, stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            documents.append([file_name, None, None])
+    return {
+        "encoder": model_provider.get_backend_name(),
+        "dim": model_provider.get_model().get_sentence_embedding_dimension(),
+        "pdf_backend": pdf_backends.get_backend_name(),
+        "near_duplicates": near_duplicates.get_settings(),
+        # Pooling is applied at search time, so changing it does not make an index stale.
+        "chunking": {key: value for key, value in chunker.get_settings().items() if key != "pooling"},
+        "quantized": bool(quantize),
+        "documents": documents,
+    }
+
+def stale_fields(saved_build_info, current_build_info):
+    """Returns the build info fields that differ between a saved index and the current run."""
+    return [field for field in current_build_info if saved_build_info.get(field) != current_build_info[field]]
+
+class SectionIndex:
+    def __init__(self, embeddings, documents, page_numbers, section_titles, contents, scales=None, chunk_owner=None):
+        self.embeddings = embeddings # (rows, dim) float32, or int8 codes when `scales` is set
+        self.scales = scales         # (rows,) float32 dequantisation scales, or None
+        self.chunk_owner = chunk_owner # (rows,) section id of each row, ascending; None when rows are sections
+        self.documents = documents
+        self.page_numbers = np.asarray(page_numbers, dtype=np.int32)
+        self.section_titles = section_titles
+        self.contents = contents
+        self.centroids = None        # (n_lists, dim) float32, set by train_ivf()
+        self.list_offsets = None     # (n_lists + 1,) CSR offsets into list_ids
+        self.list_ids = None         # row ids grouped by cluster
+        self.build_info = {}         # See build_info()
+        self.row_offsets = None      # (N + 1,) CSR offsets of each section's rows, when chunked
+        if chunk_owner is not None:
+            self.row_offsets = np.searchsorted(chunk_owner, np.arange(len(documents) + 1)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def quantized(self):
+        return self.scales is not None
+
+    @classmethod
+    def build(cls, sections_data, embeddings=None, quantize=False, chunk_owner=None):
+        """
+        Builds an index from `extract_sections` output. Section embeddings are computed through the
+        embedding cache (chunking long sections) unless precomputed, L2-normalised `embeddings` are
+        passed in; in that case the rows must match the sections with content, or their chunks as
+        given by `chunk_owner`, and no near-duplicates are dropped.
+        """
+        sections_data = [section_dict for section_dict in sections_data if section_dict['content'].strip()]
+        if embeddings is None:
+            sections_data = near_duplicates.drop_near_duplicates(sections_data)
+            embeddings, chunk_owner = encode_sections([section_dict['content'] for section_dict in sections_data])
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        scales = None
+        if quantize:
+            # Symmetric per-row int8 quantisation: value ~= code * scale.
+            scales = np.maximum(np.abs(embeddings).max(axis=1), 1e-12).astype(np.float32) / 127.0
+            embeddings = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+
+        return cls(embeddings,
+                   [section_dict['document'] for section_dict in sections_data],
+                   [section_dict['page_number'] for section_dict in sections_data],
+                   [section_dict['section_title'] for section_dict in sections_data],
+                   [section_dict['content'] for section_dict in sections_data],
+                   scales=scales, chunk_owner=chunk_owner)
+
+    def section(self, section_id):
+        """Returns the section dict for an index position."""
+        return {
+            "document": self.documents[section_id],
+            "page_number": int(self.page_numbers[section_id]),
+            "section_title": self.section_titles[section_id],
+            "content": self.contents[section_id],
+        }
+
+    def _rows(self, row_ids):
+        rows = np.asarray(self.embeddings[row_ids], dtype=np.float32)
+        return rows * self.scales[row_ids][:, None] if self.quantized else rows
+
+    def vectors(self, section_ids):
+        """
+        Returns (embeddings, chunk_owner) for the given section ids: float32 rows, dequantised if
+        needed, and the position in `section_ids` each row belongs to, or None if the index is not chunked.
+        """
+        section_ids = np.asarray(section_ids, dtype=np.int64)
+        if self.chunk_owner is None:
+            return self._rows(section_ids), None
+        starts, stops = self.row_offsets[section_ids], self.row_offsets[section_ids + 1]
+        counts = stops - starts
+        chunk_owner = np.repeat(np.arange(len(section_ids)), counts)
+        # Each row's position within its section's run of rows, added to the section's first row.
+        row_ids = starts[chunk_owner] + np.arange(len(chunk_owner)) - (np.cumsum(counts) - counts)[chunk_owner]
+        return self._rows(row_ids), chunk_owner
+
+    def _score(self, query_embedding, row_ids=None):
+        rows = self.embeddings if row_ids is None else self.embeddings[row_ids]
+        if not self.quantized:
+            return rows @ query_embedding
+        scales = self.scales if row_ids is None else self.scales[row_ids]
+        return (rows.astype(np.float32) @ query_embedding) * scales
+
+    def train_ivf(self, n_lists=None, iterations=10, seed=0):
+        """
+        Clusters the row embeddings with spherical k-means and builds the inverted lists
+        used by search(mode='ivf'). Defaults to roughly sqrt(rows) clusters.
+        """
+        vectors = self.embeddings.astype(np.float32)
+        if self.quantized:
+            vectors = vectors * self.scales[:, None]
+        n_sections = len(vectors)
+        if n_lists is None:
+            n_lists = int(np.sqrt(n_sections))
+        n_lists = max(1, min(n_lists, n_sections))
+
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n_sections, n_lists, replace=False)].copy()
+        assignments = np.zeros(n_sections, dtype=np.int64)
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = vectors[assignments == list_id]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[list_id] = centroid / max(np.linalg.norm(centroid), 1e-12)
+                else:
+                    # Re-seed empty clusters so every list stays useful.
+                    centroids[list_id] = vectors[rng.integers(n_sections)]
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+        self.centroids = centroids.astype(np.float32)
+        self.list_ids = np.argsort(assignments, kind='stable').astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def search(self, query_embedding, k=10, mode='exact', n_probe=8):
+        """
+        Returns (section_ids, cosine_scores) of the top-k sections for a normalised query embedding,
+        best first. mode='ivf' requires train_ivf() and only scores the `n_probe` nearest clusters.
+        """
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        if mode == 'ivf':
+            if self.centroids is None:
+                raise ValueError("IVF search requested but the index has no IVF lists; call train_ivf() first.")
+            nearest_lists = np.argsort(-(self.centroids @ query_embedding))[:n_probe]
+            candidate_ids = np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in nearest_lists])
+            scores = self._score(query_embedding, candidate_ids)
+            if self.chunk_owner is not None:
+                # Pool the probed rows of each section.
+                candidate_ids, row_owner = np.unique(self.chunk_owner[candidate_ids], return_inverse=True)
+                scores = pool_chunk_scores(scores[None, :], row_owner, len(candidate_ids))[0]
+        elif mode == 'exact':
+            candidate_ids = None
+            scores = self._score(query_embedding)
+            if self.chunk_owner is not None:
+                scores = pool_chunk_scores(scores[None, :], self.chunk_owner, len(self))[0]
+        else:
+            raise ValueError(f"Unknown search mode '{mode}'")
+
+        k = min(k, len(scores))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        section_ids = top if candidate_ids is None else candidate_ids[top]
+        return section_ids, scores[top]
+
+    def save(self, directory):
+        """Saves the index to `directory`, replacing an index saved there before."""
+        os.makedirs(directory, exist_ok=True)
+        metadata_path = os.path.join(directory, "metadata.json")
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path) # Written last, so an interrupted save never looks complete
+        np.save(os.path.join(directory, "embeddings.npy"), self.embeddings)
+        scales_path = os.path.join(directory, "scales.npy")
+        if self.quantized:
+            np.save(scales_path, self.scales)
+        elif os.path.exists(scales_path):
+            os.remove(scales_path)
+        chunk_owner_path = os.path.join(directory, "chunk_owner.npy")
+        if self.chunk_owner is not None:
+            np.save(chunk_owner_path, self.chunk_owner)
+        elif os.path.exists(chunk_owner_path):
+            os.remove(chunk_owner_path)
+        self.save_ivf(directory)
+        with open(metadata_path, 'w') as f:
+            json.dump({"version": INDEX_FORMAT_VERSION, "build": self.build_info, "documents": self.documents,
+                       "page_numbers": self.page_numbers.tolist(), "section_titles": self.section_titles,
+                       "contents": self.contents}, f)
+
+    def save_ivf(self, directory):
+        """Saves the IVF lists (or removes stale ones), e.g. after train_ivf() on a loaded index."""
+        ivf_path = os.path.join(directory, "ivf.npz")
+        if self.centroids is not None:
+            np.savez(ivf_path, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Loads a saved index; the embedding matrix is memory-mapped unless `mmap` is False."""
+        with open(os.path.join(directory, "metadata.json"), 'r') as f:
+            metadata = json.load(f)
+        if metadata.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported section index version {metadata.get('version')} in {directory}")
+        mmap_mode = 'r' if mmap else None
+        embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode=mmap_mode)
+        scales_path = os.path.join(directory, "scales.npy")
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        chunk_owner_path = os.path.join(directory, "chunk_owner.npy")
+        chunk_owner = np.load(chunk_owner_path) if os.path.exists(chunk_owner_path) else None
+        index = cls(embeddings, metadata["documents"], metadata["page_numbers"],
+                    metadata["section_titles"], metadata["contents"], scales=scales, chunk_owner=chunk_owner)
+        index.build_info = metadata.get("build", {})
+        ivf_path = os.path.join(directory, "ivf.npz")
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                index.centroids = ivf["centroids"]
+                index.list_offsets = ivf["list_offsets"]
+                index.list_ids = ivf["list_ids"]
+        return index
@@ -0,0 +1,76 @@
+# app/section_store.py
+from array import array
+
+import numpy as np
+
+# Columnar store for extracted sections. Each section gets a stable integer id (its row), and
+# every field lives in its own column: document names are stored once and referenced by index,
+# page numbers sit in a compact int array, titles and contents in plain lists. Ranking works on
+# ids, and the output stage fetches a section's content by id in O(1) instead of searching
+# the section list by document, page and title.
+
+class SectionStore:
+    __slots__ = ("document_names", "_document_index", "document_ids", "page_numbers", "section_titles", "contents")
+
+    def __init__(self):
+        self.document_names = []     # Distinct document names, in first-seen order
+        self._document_index = {}    # Document name -> position in document_names
+        self.document_ids = array('i') # Per section: index into document_names
+        self.page_numbers = array('i')
+        self.section_titles = []
+        self.contents = []
+
+    @classmethod
+    def from_sections(cls, sections_data):
+        """Builds a store from section dicts {'document', 'page_number', 'section_title', 'content'}."""
+        store = cls()
+        store.extend(sections_data)
+        return store
+
+    def __len__(self):
+        return len(self.contents)
+
+    def add(self, section_dict):
+        """Appends one section and returns its id."""
+        document_name = section_dict['document']
+        document_id = self._document_index.get(document_name)
+        if document_id is None:
+            document_id = self._document_index[document_name] = len(self.document_names)
+            self.document_names.append(document_name)
+        self.document_ids.append(document_id)
+        self.page_numbers.append(section_dict['page_number'])
+        self.section_titles.append(section_dict['section_title'])
+        self.contents.append(section_dict['content'])
+        return len(self.contents) - 1
+
+    def extend(self, sections_data):
+        """Appends several sections and returns the range of their ids."""
+        first_id = len(self)
+        for section_dict in sections_data:
+            self.add(section_dict)
+        return range(first_id, len(self))
+
+    def document(self, section_id):
+        return self.document_names[self.document_ids[section_id]]
+
+    def page_number(self, section_id):
+        return self.page_numbers[section_id]
+
+    def section_title(self, section_id):
+        return self.section_titles[section_id]
+
+    def content(self, section_id):
+        return self.contents[section_id]
+
+    def section(self, section_id):
+        """Returns the section dict for an id."""
+        return {
+            "document": self.document(section_id),
+            "page_number": self.page_numbers[section_id],
+            "section_title": self.section_titles[section_id],
+            "content": self.contents[section_id],
+        }
+
+    def ids_with_content(self):
+        """Returns the ids of the sections with non-blank content, as an int64 array."""
+        return np.array([section_id for section_id, content in enumerate(self.contents) if content.strip()], dtype=np.int64)
@@ -0,0 +1,317 @@
+# app/server.py
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from app import model_provider
+from app import near_duplicates
+from app import tracing
+from app.chunker import encode_sections
+from app.embedding_cache import encode_texts
+from app.extractor import extract_collection
+from app.output_formatter import get_pdf_files, parse_config, build_output
+from app.persona_analyzer import build_query_text, compute_store_boosts, rank_ids_with_embeddings
+from app.section_store import SectionStore
+
+# Long-running ranking service. The embedding model and every collection that has been
+# requested (its sections, section embeddings and boosts) stay resident in memory, so a
+# request only pays for embedding its query and summarizing its top sections.
+#
+# Endpoints:
+#   POST /rank     body: an input_config.json-style object; returns the same JSON as main.process
+#   GET  /metrics  request count, p50/p99 latency and encode batching stats
+#   GET  /health   liveness check
+#
+# A collection is only kept resident once every listed document exists and it has sections,
+# so a request naming a PDF that is not there yet is retried from disk next time. Each resident
+# collection remembers the size and mtime of its PDFs and is rebuilt when any of them changes,
+# so editing or replacing a PDF in the input folder is picked up by the next request.
+
+class BadRequest(ValueError):
+    """A request that can't be served as sent; answered with 400 instead of 500."""
+
+class EncodeBatcher:
+    """
+    Funnels every encode call through one worker thread. Texts submitted by concurrent requests
+    within `batch_window_ms` of each other are embedded together in a single encode_texts call.
+    """
+    def __init__(self, batch_window_ms=5, max_batch_texts=512):
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_texts = max_batch_texts
+        self.pending = deque() # (texts, future)
+        self.condition = threading.Condition()
+        self.batches = 0
+        self.batched_requests = 0
+        self.worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self.worker.start()
+
+    def encode(self, texts):
+        """Blocking, thread-safe replacement for embedding_cache.encode_texts."""
+        if not texts:
+            return encode_texts([])
+        future = Future()
+        with self.condition:
+            self.pending.append((list(texts), future))
+            self.condition.notify()
+        return future.result()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            # Give concurrent requests a short window to join this batch.
+            time.sleep(self.batch_window)
+            with self.condition:
+                batch = []
+                batch_texts = 0
+                while self.pending and (not batch or batch_texts + len(self.pending[0][0]) <= self.max_batch_texts):
+                    texts, future = self.pending.popleft()
+                    batch.append((texts, future))
+                    batch_texts += len(texts)
+
+            all_texts = [text for texts, _ in batch for text in texts]
+            try:
+                embeddings = encode_texts(all_texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_requests += len(batch)
+            offset = 0
+            for texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(texts)])
+                offset += len(texts)
+
+class LatencyStats:
+    def __init__(self, max_samples=10000):
+        self.samples = deque(maxlen=max_samples)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.samples.append(seconds)
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            samples = np.array(self.samples, dtype=np.float64)
+            requests, errors = self.requests, self.errors
+        if samples.size == 0:
+            return {"requests": requests, "errors": errors, "p50_ms": None, "p99_ms": None}
+        return {"requests": requests, "errors": errors,
+                "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 2),
+                "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 2)}
+
+class RankingService:
+    def __init__(self, input_folder, extraction_workers=None, batch_window_ms=5):
+        self.input_folder = input_folder
+        self.extraction_workers = extraction_workers
+        self.batcher = EncodeBatcher(batch_window_ms=batch_window_ms)
+        self.latency = LatencyStats()
+        self.collections = {} # tuple(document filenames) -> (document stats, (section_store, section_embeddings, boosts, chunk_owner))
+        self.building = {}    # tuple(document filenames) -> Future of a collection being built
+        self.collections_lock = threading.Lock() # Guards `building` and writes to `collections`
+
+    def _build_collection(self, input_documents_list):
+        print(f"Server: Loading collection of {len(input_documents_list)} documents...")
+        sections = extract_collection(self.input_folder, input_documents_list, self.extraction_workers)
+        section_store = SectionStore.from_sections(near_duplicates.drop_near_duplicates(
+            section_dict for section_dict in sections if section_dict['content'].strip()))
+        section_embeddings, chunk_owner = encode_sections(section_store.contents, encode_fn=self.batcher.encode)
+        boosts = compute_store_boosts(section_store, np.arange(len(section_store)))
+        return section_store, section_embeddings, boosts, chunk_owner
+
+    def _document_stats(self, key):
+        """(size, mtime_ns) of each listed document, or None for one that doesn't exist."""
+        document_stats = []
+        for file_name in key:
+            try:
+                stat = os.stat(os.path.join(self.input_folder, file_name))
+                document_stats.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                document_stats.append(None)
+        return tuple(document_stats)
+
+    def get_collection(self, input_documents_list):
+        key = tuple(input_documents_list)
+        # Resident collections are served without taking the lock, so building a new collection
+        # never holds up requests for other ones. Concurrent requests for the same new collection
+        # wait on the future of the request that builds it. A resident collection whose PDFs have
+        # changed on disk since it was built is rebuilt the same way.
+        document_stats = self._document_stats(key)
+        resident = self.collections.get(key)
+        if resident is not None and resident[0] == document_stats:
+            return resident[1]
+        with self.collections_lock:
+            resident = self.collections.get(key)
+            if resident is not None and resident[0] == document_stats:
+                return resident[1]
+            building = self.building.get(key)
+            is_builder = building is None
+            if is_builder:
+                building = self.building[key] = Future()
+        if not is_builder:
+            return building.result()
+
+        collection = None
+        try:
+            collection = self._build_collection(input_documents_list)
+            building.set_result(collection)
+            return collection
+        except BaseException as e:
+            building.set_exception(e)
+            raise
+        finally:
+            with self.collections_lock:
+                if collection is not None and None not in document_stats and len(collection[0]):
+                    self.collections[key] = (document_stats, collection)
+                del self.building[key]
+
+    def rank(self, config_data):
+        if not isinstance(config_data, dict):
+            raise BadRequest(f"Expected an input_config.json-style JSON object, got {type(config_data).__name__}")
+        try:
+            persona_desc, job_desc, input_documents_list = parse_config(config_data)
+        except (AttributeError, KeyError, TypeError) as e:
+            raise BadRequest(f"Malformed config: {e!r}")
+        if not isinstance(persona_desc, str) or not isinstance(job_desc, str):
+            raise BadRequest("persona.description and job_to_be_done.task must be strings")
+        if not all(isinstance(file_name, str) for file_name in input_documents_list):
+            raise BadRequest("Document filenames must be strings")
+        # Filenames come from the client, so they must not reach PDFs outside the input folder.
+        input_folder_real = os.path.realpath(self.input_folder)
+        for file_name in input_documents_list:
+            document_path = os.path.realpath(os.path.join(input_folder_real, file_name))
+            if os.path.commonpath([input_folder_real, document_path]) != input_folder_real:
+                raise BadRequest(f"Document is outside the input folder: {file_name}")
+        if not input_documents_list:
+            input_documents_list = get_pdf_files(self.input_folder)
+        section_store, section_embeddings, boosts, chunk_owner = self.get_collection(input_documents_list)
+        if not len(section_store):
+            missing_documents = [file_name for file_name in input_documents_list
+                                 if not os.path.exists(os.path.join(self.input_folder, file_name))]
+            if missing_documents:
+                raise BadRequest(f"Documents not found in the input folder: {', '.join(missing_documents)}")
+            raise ValueError("No sections extracted from any documents.")
+
+        # The query goes through the batcher, shared with concurrent requests, and is reused for summarization.
+        query_embeddings = self.batcher.encode([build_query_text(persona_desc, job_desc)])
+        # Every section in the store has content, so ranked positions are the store's section ids.
+        ranked_section_ids, _ = rank_ids_with_embeddings(query_embeddings, section_embeddings, boosts, chunk_owner)[0]
+        return build_output(section_store, ranked_section_ids, persona_desc, job_desc, input_documents_list,
+                            query_embedding=query_embeddings[0], encode_fn=self.batcher.encode)
+
+    def metrics(self):
+        metrics = self.latency.snapshot()
+        metrics.update({
+            "encode_batches": self.batcher.batches,
+            "mean_requests_per_batch": round(self.batcher.batched_requests / self.batcher.batches, 2) if self.batcher.batches else None,
+            "resident_collections": len(self.collections),
+            "model_load_seconds": model_provider.get_load_seconds(),
+        })
+        return metrics
+
+def make_handler(service):
+    class RankingRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, indent=4).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/metrics":
+                self._send_json(200, service.metrics())
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/rank":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            start_time = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                config_data = json.loads(self.rfile.read(length) or b"{}")
+            except Exception as e:
+                service.latency.record(time.perf_counter() - start_time, ok=False)
+                self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+                return
+            try:
+                with tracing.span("server.rank"):
+                    output_data = service.rank(config_data)
+            except BadRequest as e:
+                service.latency.record(time.perf_counter() - start_time, ok=False)
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                service.latency.record(time.perf_counter() - start_time, ok=False)
+                self._send_json(500, {"error": str(e)})
+                return
+            service.latency.record(time.perf_counter() - start_time)
+            self._send_json(200, output_data)
+
+        def address_string(self):
+            # Unix socket clients have no (host, port) address.
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format, *args):
+            print(f"Server: {self.address_string()} {format % args}")
+
+    return RankingRequestHandler
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # BaseHTTPRequestHandler expects these to exist.
+        self.server_name = "localhost"
+        self.server_port = 0
+
+def serve(input_folder, host="127.0.0.1", port=8080, unix_socket=None, extraction_workers=None,
+          batch_window_ms=5, preload_documents=None):
+    """
+    Starts the ranking server and blocks until interrupted. The model is warmed up and the
+    default collection (`preload_documents`, or every PDF in the input folder) is loaded
+    before the first request is accepted.
+    """
+    service = RankingService(input_folder, extraction_workers=extraction_workers, batch_window_ms=batch_window_ms)
+    model_provider.warm_up()
+    if os.path.isdir(input_folder):
+        service.get_collection(preload_documents or get_pdf_files(input_folder))
+
+    handler = make_handler(service)
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        httpd = ThreadingUnixHTTPServer(unix_socket, handler)
+        print(f"Server: Listening on unix socket {unix_socket}")
+    else:
+        httpd = ThreadingHTTPServer((host, port), handler)
+        print(f"Server: Listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Server: Shutting down.")
+    finally:
+        httpd.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
@@ -1,47 +1,27 @@
 # app/summarizer.py (Final Summary Truncation and Cleaning)
-from sentence_transformers import SentenceTransformer, util
-import torch
+import numpy as np
 import re
 
-model_name = 'all-MiniLM-L6-v2'
-try:
-    summarizer_model = SentenceTransformer(model_name)
-    print(f"Loaded SentenceTransformer model for summarization: {model_name}")
-except Exception as e:
-    print(f"Error loading SentenceTransformer model for summarization {model_name}: {e}. Please ensure it's pre-downloaded or available.")
-    raise
+from app import tracing
+from app.embedding_cache import encode_texts
 
-# Reduced default num_sentences for conciseness
-def summarize_text(text, num_sentences=4, query_embedding=None): # <--- num_sentences REDUCED
-    sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    sentences = [s for s in sentences if len(s.split()) > 5] 
-    if not sentences:
-        return ""
-
-    num_sentences = min(num_sentences, len(sentences))
-    if num_sentences == 0:
-        return ""
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s')
+BULLET_PREFIX_PATTERN = re.compile(r"^\s*[\u2022\u2023\u25E6\u2043]+\s*")
 
-    sentence_embeddings = summarizer_model.encode(sentences, convert_to_tensor=True)
-
-    if query_embedding is not None:
-        similarities = util.pytorch_cos_sim(query_embedding, sentence_embeddings)[0]
-        ranked_sentence_indices = torch.argsort(similarities, descending=True)
-        
-    else:
-        cosine_scores = util.pytorch_cos_sim(sentence_embeddings, sentence_embeddings)
-        sentence_scores = torch.sum(cosine_scores, dim=1)
-        ranked_sentence_indices = torch.argsort(sentence_scores, descending=True)
+def split_sentences(text):
+    """Splits text into candidate summary sentences, dropping very short fragments."""
+    sentences = SENTENCE_SPLIT_PATTERN.split(text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    return [s for s in sentences if len(s.split()) > 5]
 
+def _compose_summary(sentences, ranked_sentence_indices, num_sentences):
     selected_sentences_content = []
     seen_sentences_content = set()
     
     for idx in ranked_sentence_indices:
-        sentence = sentences[idx.item()]
+        sentence = sentences[idx]
         # Remove common bullet point chars from start of sentence for cleaner summary
-        cleaned_sentence = re.sub(r"^\s*[\u2022\u2023\u25E6\u2043]+\s*", "", sentence).strip()
+        cleaned_sentence = BULLET_PREFIX_PATTERN.sub("", sentence).strip()
         
         if cleaned_sentence and cleaned_sentence not in seen_sentences_content:
             selected_sentences_content.append(cleaned_sentence)
@@ -53,7 +33,7 @@ def summarize_text(text, num_sentences=4, query_embedding=None): # <--- num_sent
     selected_cleaned_set = set(selected_sentences_content) 
 
     for s_original in sentences:
-        s_original_cleaned = re.sub(r"^\s*[\u2022\u2023\u25E6\u2043]+\s*", "", s_original).strip()
+        s_original_cleaned = BULLET_PREFIX_PATTERN.sub("", s_original).strip()
         if s_original_cleaned in selected_cleaned_set:
             final_ordered_sentences.append(s_original)
 
@@ -61,4 +41,54 @@ def summarize_text(text, num_sentences=4, query_embedding=None): # <--- num_sent
     
     if final_text and not final_text.endswith(('.', '?', '!')):
         final_text += "."
-    return final_text
\ No newline at end of file
+    return final_text
+
+def summarize_sections(texts, num_sentences=4, query_embedding=None, encode_fn=encode_texts):
+    """
+    Summarizes several texts at once. Sentences from all texts are embedded in a single batched
+    encode call, scored against the query (or by centrality within their own text when no query
+    is given), and the top sentences are then selected per text.
+    `encode_fn` lets callers route sentence encoding elsewhere (e.g. the server's shared encode batcher).
+    
+    Returns:
+        list: One summary string per input text ("" when a text has no usable sentences).
+    """
+    with tracing.span("summarize_sections", texts=len(texts), num_sentences=num_sentences) as trace_span:
+        sentences_per_text = [split_sentences(text) for text in texts]
+        all_sentences = [sentence for sentences in sentences_per_text for sentence in sentences]
+        trace_span.set(sentences=len(all_sentences))
+        if not all_sentences:
+            return ["" for _ in texts]
+
+        # Segment boundaries of each text's sentences within the flat sentence list.
+        segment_offsets = np.concatenate([[0], np.cumsum([len(sentences) for sentences in sentences_per_text])])
+
+        # Normalised embeddings (cached across runs), so dot products are cosine similarities.
+        sentence_embeddings = encode_fn(all_sentences)
+
+        if query_embedding is not None:
+            sentence_scores = sentence_embeddings @ np.asarray(query_embedding, dtype=np.float32)
+        else:
+            # Centrality: similarity of each sentence to the other sentences of the same text.
+            sentence_scores = np.zeros(len(all_sentences), dtype=np.float32)
+            for start, end in zip(segment_offsets[:-1], segment_offsets[1:]):
+                segment_embeddings = sentence_embeddings[start:end]
+                sentence_scores[start:end] = np.sum(segment_embeddings @ segment_embeddings.T, axis=1)
+
+        # Segmented top-k: one stable sort by (segment, descending score) ranks every text's sentences at once.
+        segment_ids = np.repeat(np.arange(len(texts)), np.diff(segment_offsets))
+        order = np.lexsort((-sentence_scores, segment_ids))
+
+        summaries = []
+        for text_idx, sentences in enumerate(sentences_per_text):
+            if not sentences:
+                summaries.append("")
+                continue
+            start, end = segment_offsets[text_idx], segment_offsets[text_idx + 1]
+            ranked_sentence_indices = order[start:end] - start
+            summaries.append(_compose_summary(sentences, ranked_sentence_indices, min(num_sentences, len(sentences))))
+        return summaries
+
+# Reduced default num_sentences for conciseness
+def summarize_text(text, num_sentences=4, query_embedding=None, encode_fn=encode_texts): # <--- num_sentences REDUCED
+    return summarize_sections([text], num_sentences=num_sentences, query_embedding=query_embedding, encode_fn=encode_fn)[0]
\ No newline at end of file
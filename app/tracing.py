@@ -0,0 +1,192 @@
+# app/tracing.py
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Lightweight instrumentation for the pipeline: nested timing spans with attributes (batch sizes,
+# token counts, cache hits, ...) and named counters, written as one JSON trace file per run.
+# An optional cProfile dump can be taken alongside. Tracing is off by default; when disabled,
+# span() returns a shared no-op object, so instrumented code pays almost nothing.
+TRACE_FORMAT_VERSION = 1
+
+_settings = {
+    "enabled": bool(os.environ.get("TRACE_FILE")),
+    "trace_file": os.environ.get("TRACE_FILE") or None,
+    "profile_file": os.environ.get("PROFILE_FILE") or None,
+    "max_spans": 100000, # Oldest spans are dropped beyond this, e.g. in a long-running server
+}
+_spans = deque(maxlen=_settings["max_spans"])
+_counters = {}
+_lock = threading.Lock()
+_local = threading.local() # Per-thread stack of open span ids
+_next_span_id = iter(range(1, 1 << 62))
+_run_start = time.perf_counter()
+_profiler = None
+
+def configure(enabled=None, trace_file=None, profile_file=None, max_spans=None):
+    """Enables tracing, sets the trace and cProfile output paths, or changes the span limit."""
+    global _spans
+    if trace_file:
+        _settings["trace_file"] = trace_file
+        _settings["enabled"] = True
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if profile_file:
+        _settings["profile_file"] = profile_file
+    if max_spans:
+        _settings["max_spans"] = int(max_spans)
+        with _lock:
+            _spans = deque(_spans, maxlen=_settings["max_spans"])
+
+def is_enabled():
+    return _settings["enabled"]
+
+class _Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "attributes")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        """Adds or updates attributes of the span, e.g. results only known at the end."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent_id = stack[-1] if stack else None
+        self.span_id = next(_next_span_id)
+        stack.append(self.span_id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc_value}"
+        _append_span(self.name, self.span_id, self.parent_id, self.start, duration, self.attributes)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def _append_span(name, span_id, parent_id, start, duration, attributes):
+    with _lock:
+        _spans.append({
+            "name": name,
+            "id": span_id,
+            "parent": parent_id,
+            "thread": threading.current_thread().name,
+            "start_s": round(start - _run_start, 6),
+            "duration_s": round(duration, 6),
+            "attributes": attributes,
+        })
+
+def span(name, **attributes):
+    """
+    Context manager timing the enclosed block as a span nested under the current thread's open span.
+
+    Usage:
+        with tracing.span("encode", texts=len(texts)) as trace_span:
+            ...
+            trace_span.set(cache_hits=hits)
+    """
+    if not _settings["enabled"]:
+        return _NOOP_SPAN
+    return _Span(name, attributes)
+
+def record(name, duration, **attributes):
+    """Records a span measured elsewhere (e.g. in an extraction worker process) under the current span."""
+    if not _settings["enabled"]:
+        return
+    stack = getattr(_local, "stack", None)
+    _append_span(name, next(_next_span_id), stack[-1] if stack else None,
+                 time.perf_counter() - duration, duration, attributes)
+
+def count(name, value=1):
+    """Adds `value` to a named counter."""
+    if not _settings["enabled"]:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def summary():
+    """Aggregates the recorded spans by name: count, total, mean and max duration."""
+    with _lock:
+        spans = list(_spans)
+    by_name = {}
+    for recorded_span in spans:
+        stats = by_name.setdefault(recorded_span["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        stats["count"] += 1
+        stats["total_s"] += recorded_span["duration_s"]
+        stats["max_s"] = max(stats["max_s"], recorded_span["duration_s"])
+    for stats in by_name.values():
+        stats["mean_s"] = round(stats["total_s"] / stats["count"], 6)
+        stats["total_s"] = round(stats["total_s"], 6)
+    return dict(sorted(by_name.items(), key=lambda item: item[1]["total_s"], reverse=True))
+
+def start_run():
+    """Resets the trace and starts the profiler if a profile file is configured."""
+    global _run_start, _profiler
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+    _run_start = time.perf_counter()
+    if _settings["profile_file"]:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+def finish_run(**metadata):
+    """
+    Stops the profiler and writes its dump, then writes the JSON trace (spans, counters and the
+    per-name summary) if tracing is enabled. `metadata` is stored in the trace as-is.
+    """
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_settings["profile_file"])
+        top_functions = io.StringIO()
+        pstats.Stats(_profiler, stream=top_functions).sort_stats("cumulative").print_stats(15)
+        print(f"Tracing: cProfile dump written to {_settings['profile_file']}. Top functions by cumulative time:")
+        print(top_functions.getvalue())
+        _profiler = None
+
+    if not _settings["enabled"] or not _settings["trace_file"]:
+        return
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+    trace = {
+        "version": TRACE_FORMAT_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "wall_s": round(time.perf_counter() - _run_start, 6),
+        "metadata": metadata,
+        "summary": summary(),
+        "counters": counters,
+        "spans": spans,
+    }
+    trace_dir = os.path.dirname(os.path.abspath(_settings["trace_file"]))
+    os.makedirs(trace_dir, exist_ok=True)
+    with open(_settings["trace_file"], "w") as f:
+        json.dump(trace, f, indent=2)
+    print(f"Tracing: {len(spans)} spans written to {_settings['trace_file']}.")
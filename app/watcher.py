@@ -0,0 +1,201 @@
+# app/watcher.py
+import json
+import os
+import time
+
+import numpy as np
+
+from app import near_duplicates
+from app import tracing
+from app.chunker import encode_sections
+from app.extractor import extract_documents
+from app.output_formatter import DEFAULT_PERSONA, DEFAULT_JOB, build_output, parse_config
+from app.persona_analyzer import compute_boosts, encode_queries, score_with_embeddings
+from app.section_store import SectionStore
+
+# Watch mode: polls the input folder and keeps the ranking state of every document in memory
+# (its sections, embeddings, near-duplicate shingles and scores for the current query). When
+# PDFs are added or changed, only those are re-extracted, re-embedded and re-scored; removed
+# PDFs are dropped. A change to input_config.json re-embeds only the query and re-scores the
+# documents. After each change the top sections are re-selected from the stored scores and
+# output/result.json is rewritten atomically, so readers never see a partial file.
+#
+# Files are compared by size and mtime; the extraction cache then skips the parse of a file
+# that was only touched. The near-duplicate filter is re-run over the stored shingles in
+# collection order, so the kept sections match a one-shot run. Near-duplicates are embedded
+# like any other section here, so removing a document never forces another one to be encoded.
+DEFAULT_POLL_INTERVAL = float(os.environ.get("WATCH_POLL_INTERVAL", 2.0))
+
+class _DocumentState:
+    __slots__ = ("file_stat", "sections", "embeddings", "chunk_owner", "boosts", "shingles", "scores")
+
+def scan_pdf_files(input_folder):
+    """Returns {file name: (size, mtime_ns)} for the PDFs in the input folder."""
+    stats = {}
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.pdf') and entry.is_file():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue # Deleted since the directory was listed
+                stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+def write_json_atomic(output_file, data):
+    """Writes JSON to a temporary file next to `output_file` and renames it into place."""
+    tmp_path = f"{output_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, output_file)
+
+def _config_stat(config_file):
+    try:
+        stat = os.stat(config_file)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+class CollectionWatcher:
+    def __init__(self, input_folder, output_file, config_file, extraction_workers=None, batch_size=None):
+        self.input_folder = input_folder
+        self.output_file = output_file
+        self.config_file = config_file
+        self.extraction_workers = extraction_workers
+        self.batch_size = batch_size
+        self.documents = {} # file name -> _DocumentState
+        self.config_stat = False # Never matches, so the first update loads the config
+        self.persona_desc, self.job_desc, self.configured_documents = DEFAULT_PERSONA, DEFAULT_JOB, []
+        self.query_embedding = None
+        self.missing_documents = () # Configured documents not in the folder, as last reported
+        self.output_stale = True    # Set until an update has written the output
+
+    def _load_config(self, config_stat):
+        # `config_stat` is the file's current stat (None if it doesn't exist); self.config_stat is
+        # only updated once the load has succeeded.
+        self.persona_desc, self.job_desc, self.configured_documents = DEFAULT_PERSONA, DEFAULT_JOB, []
+        if config_stat is not None:
+            try:
+                with open(self.config_file, 'r') as f:
+                    self.persona_desc, self.job_desc, self.configured_documents = parse_config(json.load(f))
+            except Exception as e:
+                print(f"Error loading {self.config_file}: {e}. Using default persona/job.")
+        print(f"Watch: Persona: {self.persona_desc} | Job: {self.job_desc}")
+        self.query_embedding = encode_queries([(self.persona_desc, self.job_desc)])[0]
+
+    def _collection(self, file_stats):
+        # The configured document list in its order, else every PDF in the folder, sorted.
+        if not self.configured_documents:
+            return sorted(file_stats)
+        missing_documents = tuple(file_name for file_name in self.configured_documents if file_name not in file_stats)
+        if missing_documents != self.missing_documents:
+            # Reported when the set changes, not on every poll.
+            self.missing_documents = missing_documents
+            for file_name in missing_documents:
+                print(f"Error: PDF file '{file_name}' not found in '{self.input_folder}'. Skipping.")
+        return [file_name for file_name in dict.fromkeys(self.configured_documents) if file_name in file_stats]
+
+    def _score(self, state):
+        if not state.sections:
+            state.scores = np.zeros(0, dtype=np.float32)
+            return
+        state.scores = score_with_embeddings(self.query_embedding[None, :], state.embeddings, state.boosts, state.chunk_owner)[0]
+
+    def _load_documents(self, file_names, file_stats):
+        paths = [os.path.join(self.input_folder, file_name) for file_name in file_names]
+        for file_name, (_, sections, seconds, error) in zip(file_names, extract_documents(paths, max_workers=self.extraction_workers)):
+            if error is not None:
+                print(f"Error: Extraction failed for {file_name}: {error}. Skipping.")
+                sections = []
+            state = _DocumentState()
+            state.file_stat = file_stats[file_name]
+            state.sections = [section_dict for section_dict in sections if section_dict['content'].strip()]
+            if state.sections:
+                state.embeddings, state.chunk_owner = encode_sections([section_dict['content'] for section_dict in state.sections],
+                                                                      batch_size=self.batch_size)
+            else:
+                state.embeddings, state.chunk_owner = None, None
+            state.boosts = compute_boosts(state.sections)
+            state.shingles = []
+            if near_duplicates.is_enabled():
+                for section_dict in state.sections:
+                    hashes = near_duplicates.shingle_hashes(section_dict['content'])
+                    state.shingles.append((hashes, near_duplicates.minhash_signature(hashes)))
+            self._score(state)
+            self.documents[file_name] = state
+            print(f"Watch: Loaded {len(state.sections)} sections from {file_name} in {round(seconds, 2)}s.")
+
+    def _rank(self, collection):
+        section_store = SectionStore()
+        scores = []
+        duplicate_filter = near_duplicates.NearDuplicateFilter() if near_duplicates.is_enabled() else None
+        for file_name in collection:
+            state = self.documents[file_name]
+            keep = np.ones(len(state.sections), dtype=bool)
+            if duplicate_filter is not None:
+                keep = np.array([duplicate_filter.check_shingles(hashes, signature) is None
+                                 for hashes, signature in state.shingles], dtype=bool)
+            section_store.extend(section_dict for section_dict, kept in zip(state.sections, keep) if kept)
+            scores.append(state.scores[keep])
+        scores = np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+        # Section ids run in collection order, so ties break exactly as in the one-shot ranking.
+        return section_store, np.argsort(-scores, kind='stable')
+
+    def update(self):
+        """
+        Applies the changes since the last call. Returns True if the output was rewritten,
+        False if nothing changed.
+        """
+        start_time = time.time()
+        file_stats = scan_pdf_files(self.input_folder)
+        config_stat = _config_stat(self.config_file)
+        config_changed = config_stat != self.config_stat
+        if config_changed:
+            self._load_config(config_stat)
+            self.config_stat = config_stat # Only once loaded, so a failed load is retried
+        collection = self._collection(file_stats)
+        wanted = set(collection)
+        removed = [file_name for file_name in self.documents if file_name not in wanted]
+        changed = [file_name for file_name in collection
+                   if file_name not in self.documents or self.documents[file_name].file_stat != file_stats[file_name]]
+        if not (config_changed or removed or changed or self.output_stale):
+            return False
+
+        # Until the output is written, so an update that fails part-way is completed on the next poll.
+        self.output_stale = True
+        with tracing.span("watch.update", changed=len(changed), removed=len(removed), config_changed=config_changed):
+            for file_name in removed:
+                del self.documents[file_name]
+            if changed:
+                self._load_documents(changed, file_stats)
+            if config_changed:
+                for state in self.documents.values():
+                    self._score(state)
+
+            section_store, ranked_section_ids = self._rank(collection)
+            output_data = build_output(section_store, ranked_section_ids, self.persona_desc, self.job_desc,
+                                       self.configured_documents or collection, query_embedding=self.query_embedding)
+            write_json_atomic(self.output_file, output_data)
+            self.output_stale = False
+        print(f"Watch: {len(changed)} changed, {len(removed)} removed{', config reloaded' if config_changed else ''}; "
+              f"ranked {len(section_store)} sections from {len(collection)} documents and wrote {self.output_file} "
+              f"in {round(time.time() - start_time, 2)}s.")
+        return True
+
+def watch(input_folder, output_file, config_file, extraction_workers=None, poll_interval=None, batch_size=None):
+    """Polls the input folder every `poll_interval` seconds and keeps `output_file` up to date until interrupted."""
+    poll_interval = poll_interval or DEFAULT_POLL_INTERVAL
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    watcher = CollectionWatcher(input_folder, output_file, config_file, extraction_workers=extraction_workers,
+                                batch_size=batch_size)
+    print(f"Watch: Watching {input_folder} every {poll_interval}s (Ctrl+C to stop).")
+    try:
+        while True:
+            try:
+                watcher.update()
+            except Exception as e:
+                # E.g. a PDF deleted or rewritten mid-update; whatever is left is retried on the next poll.
+                print(f"Watch: Update failed: {e!r}. Retrying in {poll_interval}s.")
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Watch: Stopped.")
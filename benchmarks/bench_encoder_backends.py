@@ -0,0 +1,63 @@
+# benchmarks/bench_encoder_backends.py
+# Load time and encode throughput of each encoder backend on the sections of the bundled PDFs,
+# using the same length-sorted batching as model_provider.encode_batched.
+# Usage: python benchmarks/bench_encoder_backends.py [--backends torch torch-int8 onnx] [--onnx-dir DIR] [--threads 1]
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import encoder_backends
+from app import model_provider
+from app.extractor import extract_sections
+from app.output_formatter import get_pdf_files
+
+def load_section_texts(input_folder):
+    return [section['content'] for file_name in get_pdf_files(input_folder)
+            for section in extract_sections(os.path.join(input_folder, file_name)) if section['content'].strip()]
+
+def encode_sorted(encoder, texts, batch_size):
+    ordered = sorted(texts, key=len)
+    for start in range(0, len(ordered), batch_size):
+        encoder.encode(ordered[start:start + batch_size], batch_size=batch_size, convert_to_numpy=True,
+                       normalize_embeddings=True, show_progress_bar=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Encoder backend throughput benchmark.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--model", default=model_provider.get_model_name())
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"], choices=encoder_backends.BACKENDS)
+    parser.add_argument("--onnx-dir", default=os.environ.get("EMBEDDING_ONNX_DIR"))
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_section_texts(args.input)
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    print(f"{len(texts)} sections, batch size {args.batch_size}, best of {args.repeats}")
+    print(f"{'backend':>12} {'load s':>8} {'encode s':>9} {'texts/s':>9}")
+    for backend in args.backends:
+        start_time = time.perf_counter()
+        try:
+            encoder = encoder_backends.load_encoder(backend, args.model, device="cpu", onnx_dir=args.onnx_dir,
+                                                    num_threads=args.threads)
+        except Exception as e:
+            print(f"{backend:>12} skipped: {e}")
+            continue
+        load_seconds = time.perf_counter() - start_time
+        encode_sorted(encoder, texts[:args.batch_size], args.batch_size) # Warm-up
+        timings = []
+        for _ in range(args.repeats):
+            start_time = time.perf_counter()
+            encode_sorted(encoder, texts, args.batch_size)
+            timings.append(time.perf_counter() - start_time)
+        print(f"{backend:>12} {load_seconds:8.2f} {min(timings):9.3f} {len(texts) / min(timings):9.1f}")
+
+if __name__ == "__main__":
+    main()
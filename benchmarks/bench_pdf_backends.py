@@ -0,0 +1,104 @@
+# benchmarks/bench_pdf_backends.py
+# Throughput of every installed PDF text backend (see app/pdf_backends.py) on the bundled PDFs:
+# pages per second and characters per second for the raw text read, plus the time to split the
+# sections. Each backend's sections are compared with PyPDF2's (the reference the golden files
+# were made with): exact section matches, and how many (page, title) boundaries agree. A second
+# check runs the collection through the process pool split into small page ranges and verifies
+# the sections are identical to a whole-document read with the same backend.
+# Usage: python benchmarks/bench_pdf_backends.py [--input data/input] [--repeats 3] [--workers 2] [--range-size 2]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import extraction_cache
+from app import pdf_backends
+from app.extractor import _sections_from_pages, extract_documents
+from app.output_formatter import get_pdf_files
+
+REFERENCE_BACKEND = "pypdf2"
+
+def read_collection(backend, pdf_paths):
+    return [list(backend.read_pages(pdf_path)) for pdf_path in pdf_paths]
+
+def bench_backend(name, pdf_paths, repeats):
+    backend = pdf_backends.get_backend(name)
+    read_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        pages_per_document = read_collection(backend, pdf_paths)
+        read_times.append(time.perf_counter() - start_time)
+    start_time = time.perf_counter()
+    sections_per_document = [_sections_from_pages(pdf_path, pages, True) for pdf_path, pages in zip(pdf_paths, pages_per_document)]
+    split_seconds = time.perf_counter() - start_time
+
+    read_seconds = statistics.median(read_times)
+    pages = sum(len(document_pages) for document_pages in pages_per_document)
+    characters = sum(len(page) for document_pages in pages_per_document for page in document_pages)
+    return {
+        "read_s": read_seconds,
+        "split_s": split_seconds,
+        "pages_per_s": pages / read_seconds if read_seconds else float('inf'),
+        "chars_per_s": characters / read_seconds if read_seconds else float('inf'),
+        "pages": pages,
+        "sections": sections_per_document,
+    }
+
+def compare_sections(sections_per_document, reference_per_document):
+    """Returns (exact section matches, shared (page, title) boundaries, reference section count)."""
+    exact = shared = total = 0
+    for sections, reference in zip(sections_per_document, reference_per_document):
+        exact += sum(1 for section in sections if section in reference)
+        boundaries = {(section['page_number'], section['section_title']) for section in sections}
+        shared += sum(1 for section in reference if (section['page_number'], section['section_title']) in boundaries)
+        total += len(reference)
+    return exact, shared, total
+
+def check_page_ranges(name, pdf_paths, expected_per_document, workers, range_size):
+    """Extracts through the pool in page ranges and returns True if every document's sections match."""
+    pdf_backends.configure(backend=name, page_range_size=range_size)
+    start_time = time.perf_counter()
+    results = extract_documents(pdf_paths, max_workers=workers)
+    seconds = time.perf_counter() - start_time
+    matches = all(error is None and sections == expected
+                  for (_, sections, _, error), expected in zip(results, expected_per_document))
+    return matches, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-backend PDF text throughput and section parity.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2, help="Pool size for the page-range check.")
+    parser.add_argument("--range-size", type=int, default=2, help="Pages per range for the page-range check.")
+    args = parser.parse_args()
+
+    # Every read must hit the parser, and the page-range check must not be served from the cache.
+    extraction_cache.configure(enabled=False)
+    pdf_paths = [os.path.join(args.input, file_name) for file_name in get_pdf_files(args.input)]
+    available = pdf_backends.available_backends()
+    missing = [name for name in pdf_backends.BACKENDS if name not in available]
+    print(f"{len(pdf_paths)} PDFs from {args.input}; backends installed: {', '.join(available)}"
+          + (f" (not installed: {', '.join(missing)})" if missing else ""))
+
+    results = {name: bench_backend(name, pdf_paths, args.repeats) for name in available}
+    reference = results[REFERENCE_BACKEND]["sections"]
+    print(f"\n{'backend':>10} {'read s':>8} {'pages/s':>9} {'chars/s':>11} {'split s':>8} {'sections':>9} {'exact':>7} {'bounds':>7} {'ranges':>7}")
+    failures = 0
+    for name, result in results.items():
+        exact, shared, total = compare_sections(result["sections"], reference)
+        ranges_match, _ = check_page_ranges(name, pdf_paths, result["sections"], args.workers, args.range_size)
+        failures += not ranges_match
+        print(f"{name:>10} {result['read_s']:8.3f} {result['pages_per_s']:9.1f} {result['chars_per_s']:11.0f} {result['split_s']:8.3f} "
+              f"{sum(len(sections) for sections in result['sections']):9d} {exact:>3}/{total:<3} {shared:>3}/{total:<3} "
+              f"{'same' if ranges_match else 'DIFF':>7}")
+    print(f"\n'exact' and 'bounds' compare with {REFERENCE_BACKEND}; 'ranges' compares a pooled page-range read "
+          f"({args.workers} workers, {args.range_size} pages per range) with the backend's own whole-document read.")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
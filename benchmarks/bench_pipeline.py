@@ -0,0 +1,169 @@
+# benchmarks/bench_pipeline.py
+# End-to-end benchmark with per-stage timings: model load, PDF parse, section split, ranking
+# encode, summarization encode and JSON write. Runs over the bundled data/input PDFs or a
+# generated synthetic corpus (see synthetic_corpus.py), with the embedding and extraction caches
+# bypassed so every repeat does the full work. Results are written as JSON (--output) so runs
+# from different commits can be compared with --compare.
+# Usage: python benchmarks/bench_pipeline.py [--synthetic --documents 20 --pages 10 --sections-per-page 3]
+#                                            [--repeats 3] [--output results.json] [--compare baseline.json]
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import embedding_cache
+from app import model_provider
+from app.extractor import _read_pdf_pages, _split_sections, _finalize_sections
+from app.output_formatter import get_pdf_files, parse_config, build_output
+from app.persona_analyzer import rank_sections, encode_queries
+from app.section_store import SectionStore
+from synthetic_corpus import generate_corpus
+
+RESULTS_FORMAT_VERSION = 1
+STAGES = ("model_load", "pdf_parse", "section_split", "ranking_encode", "summarization_encode", "json_write")
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def load_config(input_folder):
+    config_path = os.path.join(input_folder, "input_config.json")
+    config_data = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config_data = json.load(f)
+    persona_desc, job_desc, input_documents_list = parse_config(config_data)
+    return persona_desc, job_desc, input_documents_list or get_pdf_files(input_folder)
+
+def run_once(input_folder, persona_desc, job_desc, input_documents_list, output_path):
+    """Runs the pipeline once and returns ({stage: seconds}, counts)."""
+    timings = {}
+
+    start_time = time.perf_counter()
+    pages_per_document = [_read_pdf_pages(os.path.join(input_folder, file_name))[0] for file_name in input_documents_list]
+    timings["pdf_parse"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    section_store = SectionStore()
+    for file_name, pages in zip(input_documents_list, pages_per_document):
+        section_store.extend(_finalize_sections(file_name, _split_sections(file_name, pages), pages))
+    timings["section_split"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    query_embeddings = encode_queries([(persona_desc, job_desc)])
+    ranked_section_ids, _ = rank_sections(section_store, [(persona_desc, job_desc)], query_embeddings=query_embeddings)[0]
+    timings["ranking_encode"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    output_data = build_output(section_store, ranked_section_ids, persona_desc, job_desc,
+                               input_documents_list, query_embedding=query_embeddings[0])
+    timings["summarization_encode"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with open(output_path, "w") as f:
+        json.dump(output_data, f, indent=4)
+    timings["json_write"] = time.perf_counter() - start_time
+
+    counts = {"documents": len(input_documents_list), "pages": sum(len(pages) for pages in pages_per_document),
+              "sections": len(section_store), "characters": sum(len(content) for content in section_store.contents)}
+    return timings, counts
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    print(f"{'stage':>22} {'baseline s':>11} {'current s':>10} {'change':>8}")
+    for stage in STAGES + ("total",):
+        before = baseline["stages"].get(stage, {}).get("median_s")
+        after = results["stages"][stage]["median_s"]
+        change = f"{(after - before) / before * 100:+7.1f}%" if before else "     n/a"
+        print(f"{stage:>22} {before if before is not None else float('nan'):11.4f} {after:10.4f} {change:>8}")
+    if baseline.get("corpus", {}).get("counts") != results["corpus"]["counts"]:
+        print("Warning: the corpora differ, so the timings are not directly comparable.")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with per-stage timings.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"), help="PDF folder (ignored with --synthetic).")
+    parser.add_argument("--synthetic", action="store_true", help="Benchmark a generated synthetic corpus instead.")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--sections-per-page", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write the results JSON here.")
+    parser.add_argument("--compare", default=None, metavar="RESULTS_JSON", help="Print per-stage changes against an earlier results file.")
+    args = parser.parse_args()
+
+    # Every repeat should pay for the encodes; the extraction cache is bypassed by reading pages directly.
+    embedding_cache.configure(enabled=False)
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.synthetic:
+            input_folder = os.path.join(work_dir, "input")
+            generate_corpus(input_folder, args.documents, args.pages, args.sections_per_page, args.seed)
+            corpus = {"kind": "synthetic", "documents": args.documents, "pages": args.pages,
+                      "sections_per_page": args.sections_per_page, "seed": args.seed}
+        else:
+            input_folder = args.input
+            corpus = {"kind": "folder", "path": os.path.relpath(input_folder, REPO_ROOT)}
+        persona_desc, job_desc, input_documents_list = load_config(input_folder)
+
+        # The model is loaded once per process, so its load time is measured once.
+        start_time = time.perf_counter()
+        model_provider.get_model()
+        model_load_seconds = time.perf_counter() - start_time
+
+        runs = []
+        for repeat in range(args.repeats):
+            timings, counts = run_once(input_folder, persona_desc, job_desc, input_documents_list,
+                                       os.path.join(work_dir, "result.json"))
+            runs.append(timings)
+            print(f"Run {repeat + 1}/{args.repeats}: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in timings.items()))
+
+    stages = {"model_load": {"median_s": model_load_seconds, "min_s": model_load_seconds, "runs_s": [model_load_seconds]}}
+    for stage in STAGES[1:]:
+        samples = [timings[stage] for timings in runs]
+        stages[stage] = {"median_s": statistics.median(samples), "min_s": min(samples), "runs_s": samples}
+    totals = [sum(timings.values()) for timings in runs]
+    stages["total"] = {"median_s": statistics.median(totals) + model_load_seconds,
+                       "min_s": min(totals) + model_load_seconds, "runs_s": [total + model_load_seconds for total in totals]}
+    corpus["counts"] = counts
+
+    results = {
+        "version": RESULTS_FORMAT_VERSION,
+        "git_commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": model_provider.get_backend_name(),
+        "batch_size": model_provider.get_batch_size(),
+        "repeats": args.repeats,
+        "corpus": corpus,
+        "stages": stages,
+    }
+
+    print(f"\nCorpus: {counts['documents']} documents, {counts['pages']} pages, {counts['sections']} sections")
+    print(f"{'stage':>22} {'median s':>9} {'min s':>9}")
+    for stage in STAGES + ("total",):
+        print(f"{stage:>22} {stages[stage]['median_s']:9.4f} {stages[stage]['min_s']:9.4f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
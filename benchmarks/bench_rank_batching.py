@@ -0,0 +1,65 @@
+# benchmarks/bench_rank_batching.py
+# Compares per-section encoding (the old rank_sections loop) with batched, length-bucketed
+# encoding on the bundled South of France PDFs.
+# Usage: python benchmarks/bench_rank_batching.py [--batch-sizes 8 16 32 64] [--repeats 3]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.extractor import extract_sections
+from app.output_formatter import get_pdf_files
+from app import model_provider
+
+def load_section_texts(input_folder):
+    texts = []
+    for file_name in get_pdf_files(input_folder):
+        for section in extract_sections(os.path.join(input_folder, file_name)):
+            if section['content'].strip():
+                texts.append(section['content'])
+    return texts
+
+def encode_per_section(texts):
+    model = model_provider.get_model()
+    return np.stack([
+        model.encode(text, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+        for text in texts
+    ])
+
+def best_of(repeats, fn):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-section vs batched section encoding benchmark.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_section_texts(args.input)
+    print(f"Benchmarking {len(texts)} sections from {args.input}")
+    model_provider.warm_up()
+
+    baseline_seconds, baseline_embeddings = best_of(args.repeats, lambda: encode_per_section(texts))
+    print(f"{'per-section':>14}: {baseline_seconds:8.3f}s  {len(texts) / baseline_seconds:8.1f} sections/s")
+
+    for batch_size in args.batch_sizes:
+        seconds, embeddings = best_of(args.repeats, lambda: model_provider.encode_batched(texts, batch_size=batch_size))
+        # Batched and single encodes should agree up to float noise from padding.
+        max_drift = float(np.max(np.abs(embeddings - baseline_embeddings)))
+        print(f"{'batch=' + str(batch_size):>14}: {seconds:8.3f}s  {len(texts) / seconds:8.1f} sections/s  "
+              f"speedup x{baseline_seconds / seconds:.2f}  max drift {max_drift:.1e}")
+
+if __name__ == "__main__":
+    main()
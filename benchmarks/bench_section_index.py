@@ -0,0 +1,112 @@
+# benchmarks/bench_section_index.py
+# Recall-versus-latency benchmark for SectionIndex: exact float32 search against int8-quantized
+# search and IVF search at several n_probe settings. Uses a synthetic clustered corpus by default
+# (no model needed); --real uses section embeddings from the bundled South of France PDFs instead.
+# After the table, the cheapest IVF setting reaching each recall target is compared with exact
+# search, which is the trade-off to weigh when picking main.py --ann --n-probe.
+# Usage: python benchmarks/bench_section_index.py [--sections 50000] [--dim 384] [--real]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.section_index import SectionIndex
+
+def normalize(matrix):
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+def synthetic_corpus(n_sections, dim, n_topics, n_queries, noise=1.5, seed=0):
+    # Sections are noisy points around topic directions, which is roughly how brochure sections
+    # about the same subject sit in embedding space.
+    rng = np.random.default_rng(seed)
+    topics = normalize(rng.standard_normal((n_topics, dim)))
+    sections = normalize(topics[rng.integers(n_topics, size=n_sections)] + noise * rng.standard_normal((n_sections, dim)) / np.sqrt(dim))
+    queries = normalize(topics[rng.integers(n_topics, size=n_queries)] + noise * rng.standard_normal((n_queries, dim)) / np.sqrt(dim))
+    sections_data = [{"document": f"doc_{i // 50}.pdf", "page_number": 1, "section_title": f"Section {i}", "content": "x"}
+                     for i in range(n_sections)]
+    return sections_data, sections, queries
+
+def real_corpus(n_queries):
+    from app.embedding_cache import encode_texts
+    from app.extractor import extract_sections
+    from app.output_formatter import get_pdf_files
+    input_folder = os.path.join(REPO_ROOT, "data", "input")
+    sections_data = [section for file_name in get_pdf_files(input_folder)
+                     for section in extract_sections(os.path.join(input_folder, file_name)) if section['content'].strip()]
+    embeddings = encode_texts([section['content'] for section in sections_data])
+    # Use section titles as stand-in queries.
+    queries = encode_texts([section['section_title'] for section in sections_data[:n_queries]])
+    return sections_data, embeddings, queries
+
+def run(index, queries, k, mode, n_probe, exact_results):
+    latencies = []
+    recalls = []
+    for query, exact_ids in zip(queries, exact_results):
+        start_time = time.perf_counter()
+        section_ids, _ = index.search(query, k=k, mode=mode, n_probe=n_probe)
+        latencies.append(time.perf_counter() - start_time)
+        recalls.append(len(set(section_ids.tolist()) & exact_ids) / len(exact_ids))
+    return float(np.mean(recalls)), float(np.median(latencies)) * 1000, float(np.percentile(latencies, 99)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="SectionIndex recall vs latency benchmark.")
+    parser.add_argument("--sections", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--real", action="store_true", help="Use the bundled PDFs instead of a synthetic corpus.")
+    args = parser.parse_args()
+
+    if args.real:
+        sections_data, embeddings, queries = real_corpus(args.queries)
+    else:
+        sections_data, embeddings, queries = synthetic_corpus(args.sections, args.dim, args.topics, args.queries)
+    k = min(args.k, len(sections_data))
+    print(f"Corpus: {len(sections_data)} sections x {embeddings.shape[1]} dims, {len(queries)} queries, k={k}")
+
+    exact_index = SectionIndex.build(sections_data, embeddings=embeddings)
+    exact_results = [set(exact_index.search(query, k=k)[0].tolist()) for query in queries]
+
+    start_time = time.perf_counter()
+    exact_index.train_ivf()
+    print(f"IVF training: {exact_index.centroids.shape[0]} lists in {time.perf_counter() - start_time:.2f}s")
+
+    quantized_index = SectionIndex.build(sections_data, embeddings=embeddings, quantize=True)
+    quantized_index.centroids, quantized_index.list_offsets, quantized_index.list_ids = \
+        exact_index.centroids, exact_index.list_offsets, exact_index.list_ids
+
+    print(f"{'configuration':>24} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    configurations = [("exact float32", exact_index, 'exact', 0), ("exact int8", quantized_index, 'exact', 0)]
+    n_lists = exact_index.centroids.shape[0]
+    for n_probe in sorted({1, 4, 8, 16, 32, n_lists // 4, n_lists // 2}):
+        if 0 < n_probe <= n_lists:
+            configurations.append((f"ivf n_probe={n_probe}", exact_index, 'ivf', n_probe))
+            configurations.append((f"ivf int8 n_probe={n_probe}", quantized_index, 'ivf', n_probe))
+    results = {}
+    for name, index, mode, n_probe in configurations:
+        recall, p50, p99 = run(index, queries, k, mode, n_probe, exact_results)
+        results[name] = (mode, recall, p50)
+        print(f"{name:>24} {recall:9.3f} {p50:8.3f} {p99:8.3f}")
+
+    # IVF recall depends on how many of the k nearest sections share the probed lists, so at small
+    # corpora or large k it can take most of the lists (and more time than exact search) to get there.
+    exact_p50 = results["exact float32"][2]
+    print(f"Trade-off ({n_lists} lists; exact float32 p50 {exact_p50:.3f} ms):")
+    for target in (0.9, 0.95, 0.99):
+        reaching = [(p50, name) for name, (mode, recall, p50) in results.items() if mode == 'ivf' and recall >= target]
+        if not reaching:
+            print(f"  recall@k >= {target}: no n_probe tested reaches it; use exact search")
+            continue
+        p50, name = min(reaching)
+        speedup = exact_p50 / p50
+        verdict = f"{speedup:.1f}x faster than exact" if speedup > 1 else "no faster than exact; use exact search"
+        print(f"  recall@k >= {target}: {name} at p50 {p50:.3f} ms, {verdict}")
+
+if __name__ == "__main__":
+    main()
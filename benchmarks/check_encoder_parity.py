@@ -0,0 +1,72 @@
+# benchmarks/check_encoder_parity.py
+# Parity check of the alternative encoder backends against the PyTorch embeddings, on the
+# sections of the bundled PDFs. Reports the cosine agreement of every section embedding with
+# its PyTorch counterpart, and the top-k rank overlap when the sections are ranked for a set
+# of queries (the default persona/job plus the section titles as stand-in queries).
+# Exits non-zero if a backend falls below --min-cosine or --min-overlap.
+# Usage: python benchmarks/check_encoder_parity.py --backends torch-int8 onnx --onnx-dir DIR [--k 5]
+import argparse
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import encoder_backends
+from app import model_provider
+from app.extractor import extract_sections
+from app.output_formatter import get_pdf_files, DEFAULT_PERSONA, DEFAULT_JOB
+from app.persona_analyzer import build_query_text
+
+def load_corpus(input_folder, n_queries):
+    sections = [section for file_name in get_pdf_files(input_folder)
+                for section in extract_sections(os.path.join(input_folder, file_name)) if section['content'].strip()]
+    queries = [build_query_text(DEFAULT_PERSONA, DEFAULT_JOB)] + [section['section_title'] for section in sections[:n_queries - 1]]
+    return [section['content'] for section in sections], queries
+
+def embed(encoder, texts, batch_size):
+    return encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+
+def top_k_overlap(reference_scores, candidate_scores, k):
+    reference_top = np.argsort(-reference_scores, axis=1, kind='stable')[:, :k]
+    candidate_top = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+    return np.array([len(set(a) & set(b)) / k for a, b in zip(reference_top.tolist(), candidate_top.tolist())])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encoder backends with the PyTorch reference.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--model", default=model_provider.get_model_name())
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"], choices=encoder_backends.BACKENDS)
+    parser.add_argument("--onnx-dir", default=os.environ.get("EMBEDDING_ONNX_DIR"))
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Lowest acceptable mean cosine agreement.")
+    parser.add_argument("--min-overlap", type=float, default=0.8, help="Lowest acceptable mean top-k overlap.")
+    args = parser.parse_args()
+
+    texts, queries = load_corpus(args.input, args.queries)
+    k = min(args.k, len(texts))
+    reference = encoder_backends.load_torch(args.model, device="cpu")
+    reference_sections = embed(reference, texts, args.batch_size)
+    reference_scores = embed(reference, queries, args.batch_size) @ reference_sections.T
+    print(f"{len(texts)} sections, {len(queries)} queries, top-{k}; reference: torch {args.model}")
+
+    print(f"{'backend':>12} {'mean cos':>9} {'min cos':>9} {'top-k overlap':>14} {'min overlap':>12}")
+    failures = 0
+    for backend in args.backends:
+        encoder = encoder_backends.load_encoder(backend, args.model, device="cpu", onnx_dir=args.onnx_dir)
+        candidate_sections = embed(encoder, texts, args.batch_size)
+        candidate_scores = embed(encoder, queries, args.batch_size) @ candidate_sections.T
+        cosines = np.sum(reference_sections * candidate_sections, axis=1)
+        overlaps = top_k_overlap(reference_scores, candidate_scores, k)
+        ok = cosines.mean() >= args.min_cosine and overlaps.mean() >= args.min_overlap
+        failures += not ok
+        print(f"{backend:>12} {cosines.mean():9.4f} {cosines.min():9.4f} {overlaps.mean():14.3f} {overlaps.min():12.3f}"
+              f"  {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/check_golden_sections.py
+# Golden-output check for the extractor: re-extracts the bundled PDFs (bypassing the extraction
+# cache) and compares every section boundary (document, page, title and a digest of the content)
+# with benchmarks/golden_sections.json. Exits non-zero on any difference.
+# Usage: python benchmarks/check_golden_sections.py [--update]
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.extractor import extract_sections
+from app.output_formatter import get_pdf_files
+
+GOLDEN_FILE = os.path.join(REPO_ROOT, "benchmarks", "golden_sections.json")
+
+def section_boundaries(input_folder):
+    boundaries = {}
+    for file_name in get_pdf_files(input_folder):
+        boundaries[file_name] = [
+            [section['page_number'], section['section_title'], len(section['content'].split()),
+             hashlib.sha1(section['content'].encode('utf-8')).hexdigest()[:16]]
+            for section in extract_sections(os.path.join(input_folder, file_name), use_cache=False)
+        ]
+    return boundaries
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extracted section boundaries with the golden file.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden file from the current extractor.")
+    args = parser.parse_args()
+
+    boundaries = section_boundaries(args.input)
+    if args.update:
+        # One section per line keeps diffs of the golden file readable.
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            f.write("{\n" + ",\n".join(
+                f"{json.dumps(file_name)}: [\n" + ",\n".join(json.dumps(section, ensure_ascii=False) for section in sections) + "\n]"
+                for file_name, sections in boundaries.items()) + "\n}\n")
+        print(f"Wrote {sum(len(v) for v in boundaries.values())} section boundaries to {GOLDEN_FILE}")
+        return
+
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    failures = 0
+    for file_name in sorted(set(golden) | set(boundaries)):
+        expected, actual = golden.get(file_name), boundaries.get(file_name)
+        if expected == actual:
+            print(f"OK    {file_name} ({len(actual)} sections)")
+            continue
+        failures += 1
+        print(f"FAIL  {file_name}: expected {len(expected or [])} sections, got {len(actual or [])}")
+        for i, (expected_section, actual_section) in enumerate(zip(expected or [], actual or [])):
+            if expected_section != actual_section:
+                print(f"      first difference at section {i}: {expected_section} != {actual_section}")
+                break
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
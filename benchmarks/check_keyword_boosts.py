@@ -0,0 +1,124 @@
+# benchmarks/check_keyword_boosts.py
+# Equivalence check for the compiled keyword boosts (app/keyword_boosts.py): the boosts of the
+# bundled sections and of randomized titles and document names, built from the keywords, pieces
+# of them, main-title prefixes, bullets and case changes, are compared bit for bit with the
+# original per-section implementation kept below as the reference. Runs against the default
+# keyword table, which the reference hard-codes. Exits non-zero on any difference.
+# Usage: python benchmarks/check_keyword_boosts.py [--input data/input] [--titles 20000] [--seed 0]
+import argparse
+import os
+import random
+import re
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.extractor import extract_collection
+from app.keyword_boosts import DEFAULT_TABLE_FILE, KeywordBoostEngine
+from app.output_formatter import get_pdf_files
+
+REFERENCE_KEYWORDS = {
+    "cities": 0.08, "things to do": 0.10, "activities": 0.10, "experiences": 0.09, "coastal adventures": 0.12,
+    "nightlife and entertainment": 0.15, "restaurants": 0.07, "cuisine": 0.07, "culinary experiences": 0.09,
+    "wine tasting": 0.06, "packing": 0.05, "tips and tricks": 0.06, "travel tips": 0.06, "water sports": 0.12,
+    "hotels": 0.03, "shopping and markets": 0.04, "outdoor activities": 0.08, "family-friendly": -0.10,
+    "history": -0.05, "traditions and culture": -0.03, "conclusion": -0.02, "introduction": -0.01,
+}
+MAIN_TITLE_PREFIXES = ["comprehensive", "ultimate", "a culinary journey", "a historical journey", "a comprehensive guide"]
+FILLER_WORDS = ["guide", "the", "south", "of", "france", "to", "and", "a", "best", "local", "nice", "marseille",
+                "journey", "tips", "wine", "things", "sports", "culture", "city", "hotel", "-", "friendly"]
+SEPARATORS = [" ", "  ", "\t", "\n", " \u2022 ", "\u2023", " \u25E6 ", "\u2043", " \u2022\u2022 "]
+
+def reference_boost(section_title, document):
+    """The per-section boost as originally written in persona_analyzer.compute_title_boost."""
+    boost = 0.0
+    title_lower = section_title.lower()
+    title_lower = re.sub(r'[\s\u2022\u2023\u25E6\u2043]+', ' ', title_lower).strip()
+    doc_lower = document.lower()
+    for keyword, boost_value in REFERENCE_KEYWORDS.items():
+        if keyword in title_lower or keyword in doc_lower:
+            boost += boost_value
+    if re.match(r"(?:comprehensive|ultimate|a culinary journey|a historical journey|a comprehensive guide).*", title_lower):
+        if "cities" in title_lower and "cities" in doc_lower:
+            boost += 0.15
+        elif ("things to do" in title_lower or "activities" in title_lower) and "things to do" in doc_lower:
+            boost += 0.15
+        elif "cuisine" in title_lower and "cuisine" in doc_lower:
+            boost += 0.10
+        elif "restaurants and hotels" in title_lower and "restaurants and hotels" in doc_lower:
+            boost += 0.08
+        elif "tips and tricks" in title_lower and "tips and tricks" in doc_lower:
+            boost += 0.10
+        elif "history" in title_lower and "history" in doc_lower:
+            boost += 0.01
+        elif "traditions and culture" in title_lower and "traditions and culture" in doc_lower:
+            boost += 0.01
+    return boost
+
+def random_phrase(rng, max_parts):
+    parts = []
+    for _ in range(rng.randint(1, max_parts)):
+        kind = rng.random()
+        if kind < 0.45:
+            parts.append(rng.choice(list(REFERENCE_KEYWORDS)))
+        elif kind < 0.6:
+            # A cut keyword, so near misses ("things to", "citie") are covered.
+            keyword = rng.choice(list(REFERENCE_KEYWORDS))
+            start = rng.randint(0, len(keyword) - 1)
+            parts.append(keyword[start:rng.randint(start + 1, len(keyword))])
+        else:
+            parts.append(rng.choice(FILLER_WORDS))
+    text = ""
+    for part in parts:
+        text += part + rng.choice(SEPARATORS) if rng.random() < 0.8 else part
+    if rng.random() < 0.3:
+        text = rng.choice(SEPARATORS) + text
+    case = rng.random()
+    return text.upper() if case < 0.1 else text.title() if case < 0.3 else text
+
+def random_sections(count, documents, seed):
+    rng = random.Random(seed)
+    titles, section_documents = [], []
+    for _ in range(count):
+        title = random_phrase(rng, 5)
+        if rng.random() < 0.3:
+            title = rng.choice(MAIN_TITLE_PREFIXES) + rng.choice(SEPARATORS) + title
+        titles.append(title)
+        section_documents.append(rng.choice(documents) if rng.random() < 0.5 else random_phrase(rng, 3) + ".pdf")
+    return titles, section_documents
+
+def compare(name, titles, documents):
+    expected = np.array([reference_boost(title, document) for title, document in zip(titles, documents)], dtype=np.float32)
+    # A fresh engine for the whole list at once, then a second pass in small batches on the same
+    # engine, so the memoized matches are checked as well.
+    engine = KeywordBoostEngine.from_file(DEFAULT_TABLE_FILE)
+    passes = [engine.boosts(titles, documents),
+              np.concatenate([engine.boosts(titles[i:i + 97], documents[i:i + 97]) for i in range(0, len(titles), 97)])]
+    failures = 0
+    for actual in passes:
+        mismatches = np.flatnonzero(expected.view(np.uint32) != actual.view(np.uint32))
+        failures += len(mismatches)
+        for i in mismatches[:5]:
+            print(f"      {titles[i]!r} in {documents[i]!r}: expected {expected[i]!r}, got {actual[i]!r}")
+    print(f"{'OK  ' if not failures else 'FAIL'}  {name}: {len(titles)} sections, {failures} mismatches")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled keyword boosts with the original implementation.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    parser.add_argument("--titles", type=int, default=20000, help="Randomized titles to check.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sections = extract_collection(args.input, get_pdf_files(args.input))
+    failures = compare("bundled sections", [section['section_title'] for section in sections],
+                       [section['document'] for section in sections])
+    titles, documents = random_sections(args.titles, get_pdf_files(args.input) or ["document.pdf"], args.seed)
+    failures += compare("randomized titles", titles, documents)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/check_watch_config.py
+# Checks watch mode's handling of input_config.json appearing and disappearing while it runs
+# (see app/watcher.py): with no config at start the defaults are used without a load error,
+# a config created later is picked up on the next update, and deleting it falls back to the
+# defaults again, also without a load error. Runs in a temporary folder with one bundled PDF,
+# with both caches disabled. Exits non-zero if any step fails.
+# Usage: python benchmarks/check_watch_config.py [--input data/input]
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import embedding_cache
+from app import extraction_cache
+from app.output_formatter import DEFAULT_PERSONA, DEFAULT_JOB, get_pdf_files
+from app.watcher import CollectionWatcher
+
+CONFIG = {"persona": {"description": "Food Critic"}, "job_to_be_done": {"task": "Find the best local dishes."}}
+
+def run_update(watcher):
+    """Runs one update, returning (output rewritten, printed log)."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        updated = watcher.update()
+    return updated, log.getvalue()
+
+def check(name, watcher, updated, log, expected_updated, expected_persona, expected_job):
+    ok = (updated == expected_updated and "Error loading" not in log
+          and (watcher.persona_desc, watcher.job_desc) == (expected_persona, expected_job))
+    if ok and updated:
+        with open(watcher.output_file, 'r') as f:
+            metadata = json.load(f)["metadata"]
+        ok = (metadata["persona"], metadata["job_to_be_done"]) == (expected_persona, expected_job)
+    print(f"{'OK  ' if ok else 'FAIL'}  {name}: updated={updated}, persona={watcher.persona_desc!r}")
+    if not ok:
+        print("      " + log.strip().replace("\n", "\n      "))
+    return not ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Check watch mode with a config created and deleted while running.")
+    parser.add_argument("--input", default=os.path.join(REPO_ROOT, "data", "input"))
+    args = parser.parse_args()
+
+    embedding_cache.configure(enabled=False)
+    extraction_cache.configure(enabled=False)
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_folder = os.path.join(work_dir, "input")
+        os.makedirs(input_folder)
+        pdf_name = min(get_pdf_files(args.input), key=lambda file_name: os.path.getsize(os.path.join(args.input, file_name)))
+        shutil.copy(os.path.join(args.input, pdf_name), input_folder)
+        config_file = os.path.join(input_folder, "input_config.json")
+        watcher = CollectionWatcher(input_folder, os.path.join(work_dir, "result.json"), config_file)
+
+        failures = check("no config at start", watcher, *run_update(watcher), True, DEFAULT_PERSONA, DEFAULT_JOB)
+        failures += check("no change", watcher, *run_update(watcher), False, DEFAULT_PERSONA, DEFAULT_JOB)
+
+        with open(config_file, 'w') as f:
+            json.dump(CONFIG, f)
+        failures += check("config created", watcher, *run_update(watcher), True,
+                          CONFIG["persona"]["description"], CONFIG["job_to_be_done"]["task"])
+        failures += check("no change", watcher, *run_update(watcher), False,
+                          CONFIG["persona"]["description"], CONFIG["job_to_be_done"]["task"])
+
+        os.remove(config_file)
+        failures += check("config deleted", watcher, *run_update(watcher), True, DEFAULT_PERSONA, DEFAULT_JOB)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# benchmarks/export_onnx.py
+# Exports the embedding model to ONNX for the onnx encoder backend (main.py --backend onnx
+# --onnx-dir OUTPUT_DIR). Needs torch, onnx and onnxruntime at export time; only onnxruntime
+# and the saved tokenizer are needed to run the exported model.
+# Usage: python benchmarks/export_onnx.py OUTPUT_DIR [--model all-MiniLM-L6-v2] [--quantize]
+import argparse
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import encoder_backends
+from app import model_provider
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--model", default=model_provider.get_model_name())
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 dynamically quantized model and use it.")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    encoder_backends.export_onnx(args.model, args.output_dir, quantize=args.quantize, opset_version=args.opset)
+
+if __name__ == "__main__":
+    main()
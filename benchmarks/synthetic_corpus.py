@@ -0,0 +1,122 @@
+# benchmarks/synthetic_corpus.py
+# Generates a synthetic PDF collection of configurable size for benchmarking: brochure-like
+# documents with Title Case section headings and paragraphs of travel vocabulary. The PDFs are
+# written by hand (one Helvetica text stream per page), so no PDF library is needed, and
+# PyPDF2 reads them back one text line per line.
+# Usage: python benchmarks/synthetic_corpus.py OUTPUT_DIR [--documents 10] [--pages 8] [--sections-per-page 3] [--seed 0]
+import argparse
+import json
+import os
+import random
+
+WORDS = ("beach coast village market harbour museum festival wine cheese bakery garden castle river "
+         "hike cycling boat ferry train sunset terrace vineyard lavender olive seafood cafe nightlife "
+         "gallery cathedral square island cove cliff trail picnic tour guide hotel hostel budget luxury "
+         "family friends group evening morning weekend summer winter local traditional modern historic").split()
+HEADING_WORDS = ("Coastal Adventures Hidden Villages Local Markets Wine Tasting Nightlife Outdoor Activities "
+                 "Culinary Experiences Travel Tips Family Friendly Options Historic Towns Island Escapes "
+                 "Packing Essentials Festivals Events Harbour Walks Mountain Trails").split()
+LINE_WIDTH = 90  # Characters per text line
+PAGE_LINES = 48  # Text lines per page
+
+def _paragraph(rng, n_words):
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    sentences = []
+    while words:
+        sentence_length = rng.randint(8, 16)
+        sentence, words = words[:sentence_length], words[sentence_length:]
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    return " ".join(sentences)
+
+def _wrap(text, width=LINE_WIDTH):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+def _heading(rng, used):
+    # Title Case and unique within the document, so the heading detector splits on every heading.
+    while True:
+        heading = " ".join(rng.sample(HEADING_WORDS, rng.randint(2, 4)))
+        if heading not in used:
+            used.add(heading)
+            return heading
+
+def document_pages(rng, n_pages, sections_per_page, title):
+    """Returns the text lines of each page of one synthetic document."""
+    used_headings = set()
+    pages = []
+    body_lines = (PAGE_LINES - 2) // sections_per_page - 1
+    for page_idx in range(n_pages):
+        lines = [title] if page_idx == 0 else []
+        for _ in range(sections_per_page):
+            lines.append(_heading(rng, used_headings))
+            lines.extend(_wrap(_paragraph(rng, body_lines * 12))[:body_lines])
+        pages.append(lines)
+    return pages
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    """Writes a minimal PDF with one page per list of text lines."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{i} 0 R" for i in page_ids).encode(), len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (object_id, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as f:
+        f.write(output)
+
+def generate_corpus(output_dir, n_documents=10, n_pages=8, sections_per_page=3, seed=0):
+    """
+    Writes `n_documents` synthetic PDFs and an input_config.json listing them to `output_dir`.
+    Returns the list of PDF file names.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    file_names = []
+    for doc_idx in range(n_documents):
+        file_name = f"Synthetic Guide {doc_idx + 1:03d}.pdf"
+        title = f"A Comprehensive Guide To {' '.join(rng.sample(HEADING_WORDS, 2))}"
+        write_pdf(os.path.join(output_dir, file_name), document_pages(rng, n_pages, sections_per_page, title))
+        file_names.append(file_name)
+    with open(os.path.join(output_dir, "input_config.json"), "w") as f:
+        json.dump({"persona": {"description": "Travel Planner"},
+                   "job_to_be_done": {"task": "Plan a trip of 4 days for a group of 10 college friends."},
+                   "documents": [{"filename": file_name} for file_name in file_names]}, f, indent=4)
+    return file_names
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF corpus.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--sections-per-page", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    file_names = generate_corpus(args.output_dir, args.documents, args.pages, args.sections_per_page, args.seed)
+    print(f"Wrote {len(file_names)} PDFs of {args.pages} pages to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
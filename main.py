@@ -4,28 +4,80 @@ import time
 import os
 import argparse
 import re
-from sentence_transformers import SentenceTransformer, util
 
-from app.extractor import extract_sections
-from app.persona_analyzer import rank_sections
-from app.summarizer import summarize_text
-from app.output_formatter import get_pdf_files
+import numpy as np
+
+from app.extractor import extract_collection, iter_collection_sections
+from app.pipeline import run_pipeline
+from app.persona_analyzer import rank_sections, rank_sections_with_index, rank_section_stream, encode_queries
+from app.section_index import SectionIndex, build_info, stale_fields
+from app.section_store import SectionStore
+from app.output_formatter import get_pdf_files, parse_config, build_output
+from app.output_formatter import DEFAULT_PERSONA, DEFAULT_JOB
+from app import model_provider
+from app import embedding_cache
+from app import extraction_cache
+from app import pdf_backends
+from app import chunker
+from app import keyword_boosts
+from app import near_duplicates
+from app import tracing
 
 INPUT_FOLDER_REL = "data/input"
 OUTPUT_FILE_REL = "output/result.json"
 INPUT_CONFIG_FILE_REL = os.path.join(INPUT_FOLDER_REL, "input_config.json")
+BATCH_OUTPUT_FOLDER_REL = "output/batch"
+
+# The embedding model is shared through app.model_provider and loaded lazily on first use.
+# It will be available because of Dockerfile's RUN command.
+
+def report_run_stats(start_time, output_location):
+    cache = embedding_cache.get_cache()
+    if cache is not None:
+        cache.save() # Persist LRU ticks from cache hits
+        print(f"Embedding cache: {cache.stats()}")
+
+    model_load_seconds = model_provider.get_load_seconds()
+    if model_load_seconds is not None:
+        print(f"Model load took {round(model_load_seconds, 2)}s of the total run time.")
+    print(f"✅ Completed in {round(time.time() - start_time, 2)}s. Output saved to {output_location}")
 
-# Load the model once globally for efficiency.
-# This model will be available because of Dockerfile's RUN command.
-try:
-    embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Main: Loaded SentenceTransformer model for query embedding.")
-except Exception as e:
-    print(f"Main: Error loading SentenceTransformer model: {e}. Ensure it's pre-downloaded.")
-    # This is a critical error, so re-raise as the system cannot function without it.
-    raise
-
-def process():
+def load_or_build_index(index_dir, input_folder_abs, input_documents_list, extraction_workers=None,
+                        quantize=False, ann=False):
+    """
+    Loads the section index saved in `index_dir`, or extracts the collection, builds the index
+    and saves it there. A saved index is rebuilt when it was built from other documents or file
+    versions, another encoder or other settings (see section_index.build_info).
+    """
+    current_build_info = build_info(input_folder_abs, input_documents_list, quantize=quantize)
+    index = None
+    if os.path.exists(os.path.join(index_dir, "metadata.json")):
+        try:
+            index = SectionIndex.load(index_dir)
+        except ValueError as e:
+            print(f"Section index in {index_dir} can't be used: {e}. Rebuilding it.")
+        else:
+            changed = stale_fields(index.build_info, current_build_info)
+            if changed:
+                print(f"Section index in {index_dir} is stale ({', '.join(changed)} changed). Rebuilding it.")
+                index = None
+            else:
+                print(f"Loaded section index with {len(index)} sections from {index_dir}.")
+    if index is None:
+        sections = extract_collection(input_folder_abs, input_documents_list, extraction_workers)
+        index = SectionIndex.build(sections, quantize=quantize)
+        index.build_info = current_build_info
+        if ann:
+            index.train_ivf()
+        index.save(index_dir)
+        print(f"Built section index with {len(index)} sections in {index_dir}.")
+    if ann and index.centroids is None:
+        index.train_ivf()
+        index.save_ivf(index_dir) # So later --ann runs don't train again
+    return index
+
+def process(extraction_workers=None, index_dir=None, candidate_k=100, ann=False, n_probe=8, quantize_index=False,
+            stream=False, whole_document='keep', chunk_pages=10, pipeline=False, queue_depth=None):
     start_time = time.time()
     
     # Define absolute paths based on the current working directory (which is /app inside Docker)
@@ -36,19 +88,13 @@ def process():
     # Ensure the output directory exists
     os.makedirs(os.path.dirname(output_file_abs), exist_ok=True)
 
-    # Default persona and job descriptions for fallback if input_config.json is missing or malformed
-    persona_desc = "General Analyst"
-    job_desc = "Extract key information from documents."
-    input_documents_list = []
+    persona_desc, job_desc, input_documents_list = DEFAULT_PERSONA, DEFAULT_JOB, []
 
     # --- Load persona and job from input_config.json ---
     if os.path.exists(input_config_file_abs):
         try:
             with open(input_config_file_abs, 'r') as f:
-                config_data = json.load(f)
-                persona_desc = config_data.get('persona', {}).get('description', persona_desc)
-                job_desc = config_data.get('job_to_be_done', {}).get('task', job_desc)
-                input_documents_list = [doc['filename'] for doc in config_data.get('documents', [])]
+                persona_desc, job_desc, input_documents_list = parse_config(json.load(f))
                 print(f"Loaded persona and job from {input_config_file_abs}.")
         except Exception as e:
             print(f"Error loading {input_config_file_abs}: {e}. Using default persona/job.")
@@ -61,98 +107,228 @@ def process():
 
     print(f"Processing for Persona: {persona_desc} | Job: {job_desc}")
 
-    all_extracted_sections_for_ranking = [] 
+    # Embedded once and used for both ranking and summarization. The pipeline embeds it in its
+    # embedding worker instead, so the model load overlaps extraction.
+    query_embedding = None if pipeline and not (index_dir or stream) else encode_queries([(persona_desc, job_desc)])[0]
+
+    if index_dir:
+        # --- Steps 1 & 2 via the persistent section index: retrieve top candidates, then boost ---
+        index = load_or_build_index(index_dir, input_folder_abs, input_documents_list, extraction_workers,
+                                    quantize=quantize_index, ann=ann)
+        if len(index) == 0:
+            print("No sections in the section index. Exiting.")
+            return
+        search_desc = f"ivf search, n_probe={n_probe}" if ann else "exact search"
+        print(f"Ranking top {candidate_k} of {len(index)} indexed sections ({search_desc})...")
+        ranked_section_ids, _ = rank_sections_with_index(index, persona_desc, job_desc, candidate_k=candidate_k,
+                                                         mode='ivf' if ann else 'exact', n_probe=n_probe,
+                                                         query_embedding=query_embedding)
+        section_store = index # Sections are fetched from the index by id
+    elif stream:
+        # --- Steps 1 & 2 streamed: sections flow page by page into the encoder, keeping only the best ---
+        section_stream = iter_collection_sections(input_folder_abs, input_documents_list,
+                                                  whole_document=whole_document, chunk_pages=chunk_pages)
+        ranked_sections_with_scores = rank_section_stream(section_stream, persona_desc, job_desc,
+                                                          top_k=candidate_k, query_embedding=query_embedding)
+        if not ranked_sections_with_scores:
+            print("No sections extracted from any documents. Exiting.")
+            return
+        # The kept sections, already in rank order, become ids 0..k-1.
+        section_store = SectionStore.from_sections(section_dict for _, section_dict in ranked_sections_with_scores)
+        ranked_section_ids = range(len(section_store))
+    elif pipeline:
+        # --- Steps 1 & 2 pipelined: each document is embedded as soon as it is extracted ---
+        section_store, ranked_per_query, query_embeddings, _ = run_pipeline(
+            input_folder_abs, input_documents_list, [(persona_desc, job_desc)],
+            extraction_workers=extraction_workers, queue_depth=queue_depth)
+        if not len(section_store):
+            print("No sections extracted from any documents. Exiting.")
+            return
+        ranked_section_ids, _ = ranked_per_query[0]
+        query_embedding = query_embeddings[0]
+    else:
+        # --- Step 1: Extract sections from all PDFs ---
+        section_store = SectionStore.from_sections(extract_collection(input_folder_abs, input_documents_list, extraction_workers))
+
+        if not len(section_store):
+            print("No sections extracted from any documents. Exiting.")
+            return
+
+        # --- Step 2: Rank all extracted sections globally based on persona and job ---
+        print(f"Ranking {len(section_store)} sections globally...")
+        # `rank_sections` returns (section_ids, scores) arrays per query, sorted by score.
+        ranked_section_ids, _ = rank_sections(section_store, [(persona_desc, job_desc)],
+                                                   query_embeddings=query_embedding[None, :])[0]
+
+    # --- Steps 3 & 4: Top sections and their refined summaries ---
+    output_data = build_output(section_store, ranked_section_ids,
+                               persona_desc, job_desc, input_documents_list, query_embedding=query_embedding)
+
+    # Write the final JSON output to the specified file
+    with tracing.span("write_output"):
+        with open(output_file_abs, "w") as f:
+            json.dump(output_data, f, indent=4)
+
+    report_run_stats(start_time, output_file_abs)
+
+def _output_slug(text, max_length=40):
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:max_length].rstrip('-') or "persona"
+
+def process_batch(batch_config_file, extraction_workers=None, pipeline=False, queue_depth=None):
+    """
+    Runs many persona/job configs against one document collection. Sections are extracted and
+    embedded once, all queries are scored together as a query-by-section matrix, and one result
+    JSON per config is written to output/batch/.
     
-    # --- Step 1: Extract sections from all PDFs ---
-    for file_name in input_documents_list:
-        path = os.path.join(input_folder_abs, file_name)
-        if not os.path.exists(path):
-            print(f"Error: PDF file '{file_name}' not found at '{path}'. Skipping.")
-            continue
-        print(f"Extracting sections from {file_name}...")
-        
-        # `extract_sections` returns a list of dictionaries: {'document', 'page_number', 'section_title', 'content'}
-        sections_for_file = extract_sections(path)
-        all_extracted_sections_for_ranking.extend(sections_for_file)
+    The batch file is a JSON list of input_config.json-style objects (or {"configs": [...]}).
+    The collection is the union of the documents they list, or every PDF in the input folder.
+    Each config is ranked against, and reports, only its own documents (the whole collection
+    when it lists none): the union is scored once and each ranking is masked to the config's documents.
+    """
+    start_time = time.time()
+    input_folder_abs = os.path.join(os.getcwd(), INPUT_FOLDER_REL)
+    batch_output_folder_abs = os.path.join(os.getcwd(), BATCH_OUTPUT_FOLDER_REL)
+    os.makedirs(batch_output_folder_abs, exist_ok=True)
 
-    if not all_extracted_sections_for_ranking:
-        print("No sections extracted from any documents. Exiting.")
+    with open(batch_config_file, 'r') as f:
+        batch_data = json.load(f)
+    configs = batch_data.get('configs', []) if isinstance(batch_data, dict) else batch_data
+    queries = [parse_config(config_data) for config_data in configs]
+    if not queries:
+        print(f"No persona/job configs found in {batch_config_file}. Exiting.")
         return
+    print(f"Loaded {len(queries)} persona/job configs from {batch_config_file}.")
 
-    # --- Step 2: Rank all extracted sections globally based on persona and job ---
-    print(f"Ranking {len(all_extracted_sections_for_ranking)} sections globally...")
-    # `rank_sections` returns a list of (relevance_score, original_section_dict) tuples, sorted by score.
-    ranked_sections_with_scores = rank_sections(all_extracted_sections_for_ranking, persona_desc, job_desc)
+    input_documents_list = list(dict.fromkeys(file_name for _, _, documents in queries for file_name in documents))
+    if not input_documents_list:
+        input_documents_list = get_pdf_files(input_folder_abs)
 
-    # --- Step 3: Populate 'extracted_sections' for output (top N globally ranked sections) ---
-    # The challenge's sample output typically shows a fixed number of top sections (e.g., 5).
-    num_top_sections_to_output = 5 
-    final_extracted_sections_for_output = []
-    
-    # Iterate through the globally ranked sections and pick the top N
-    for i, (score, section_dict) in enumerate(ranked_sections_with_scores[:num_top_sections_to_output]):
-        final_extracted_sections_for_output.append({
-            "document": section_dict['document'],
-            "page_number": section_dict['page_number'],
-            "section_title": section_dict['section_title'],
-            "importance_rank": i + 1 # Assign a global rank (1 to N)
-        })
-    
-    # --- Step 4: Generate 'sub_section_analysis' ('refined_text') for the selected top sections ---
-    sub_section_analysis_results = []
-    
-    # Create the query embedding once for summarization based on persona and job
-    query_for_summarization_embedding = embedding_model.encode(f"{persona_desc} {job_desc}", convert_to_tensor=True)
-
-    # Iterate through the sections that *made it into the final_extracted_sections_for_output*
-    # to generate their summaries.
-    for section_data_in_output in final_extracted_sections_for_output: 
-        full_content_for_summary = ""
-        # Find the original full content for this section from the `all_extracted_sections_for_ranking` list.
-        # This ensures we summarize the complete content of the identified section.
-        for raw_section in all_extracted_sections_for_ranking:
-            # Match by document, page number, and section title for robustness
-            if raw_section['document'] == section_data_in_output['document'] and \
-               raw_section['page_number'] == section_data_in_output['page_number'] and \
-               raw_section['section_title'] == section_data_in_output['section_title']:
-                full_content_for_summary = raw_section['content']
-                break
-        
-        if full_content_for_summary.strip(): # Only summarize if content exists
-            print(f"Summarizing section: {section_data_in_output['section_title']} from {section_data_in_output['document']} (Page {section_data_in_output['page_number']})...")
-            # Use query-based summarization to make refined text persona-relevant
-            # You can adjust `num_sentences` here for shorter/longer summaries
-            refined_text = summarize_text(full_content_for_summary, num_sentences=7, query_embedding=query_for_summarization_embedding)
-            
-            sub_section_analysis_results.append({
-                "document": section_data_in_output['document'],
-                "refined_text": refined_text,
-                "page_number": section_data_in_output['page_number']
-            })
-    
-    # Sort sub_section_analysis results by document name then page number for consistent output
-    sub_section_analysis_results.sort(key=lambda x: (x['document'], x['page_number']))
-
-    # --- Final Output Construction ---
-    output_data = {
-        "metadata": {
-            "input_documents": input_documents_list,
-            "persona": persona_desc,
-            "job_to_be_done": job_desc,
-            "processing_timestamp": time.strftime("%Y-%m-%d %H:%M:%S") # Generate current timestamp
-        },
-        "extracted_sections": final_extracted_sections_for_output,
-        "sub_section_analysis": sub_section_analysis_results
-    }
+    persona_job_pairs = [(persona_desc, job_desc) for persona_desc, job_desc, _ in queries]
+    if pipeline:
+        # --- Steps 1 & 2 pipelined: documents are embedded as they are extracted ---
+        section_store, ranked_per_query, query_embeddings, _ = run_pipeline(
+            input_folder_abs, input_documents_list, persona_job_pairs,
+            extraction_workers=extraction_workers, queue_depth=queue_depth)
+        if not len(section_store):
+            print("No sections extracted from any documents. Exiting.")
+            return
+    else:
+        # --- Step 1: Extract once for the whole batch ---
+        section_store = SectionStore.from_sections(extract_collection(input_folder_abs, input_documents_list, extraction_workers))
+        if not len(section_store):
+            print("No sections extracted from any documents. Exiting.")
+            return
 
-    # Write the final JSON output to the specified file
-    with open(output_file_abs, "w") as f:
-        json.dump(output_data, f, indent=4)
+        # --- Step 2: Embed sections once and score every query against them ---
+        print(f"Ranking {len(section_store)} sections for {len(queries)} personas...")
+        query_embeddings = encode_queries(persona_job_pairs)
+        ranked_per_query = rank_sections(section_store, persona_job_pairs, query_embeddings=query_embeddings)
+
+    # --- Steps 3 & 4 per persona ---
+    section_document_ids = np.array(section_store.document_ids, dtype=np.int64)
+    for i, ((persona_desc, job_desc, documents), (ranked_section_ids, _)) in enumerate(zip(queries, ranked_per_query)):
+        print(f"Building output for Persona: {persona_desc} | Job: {job_desc}")
+        if documents:
+            # Sections are scored independently, so dropping the other configs' documents from the
+            # union ranking gives the ranking of this config's documents alone.
+            document_names = {os.path.basename(file_name) for file_name in documents}
+            in_documents = np.array([document_name in document_names for document_name in section_store.document_names],
+                                    dtype=bool)
+            ranked_section_ids = ranked_section_ids[in_documents[section_document_ids[ranked_section_ids]]]
+        output_data = build_output(section_store, ranked_section_ids,
+                                   persona_desc, job_desc, documents or input_documents_list,
+                                   query_embedding=query_embeddings[i])
+        output_file_abs = os.path.join(batch_output_folder_abs, f"result_{i + 1:03d}_{_output_slug(persona_desc)}.json")
+        with tracing.span("write_output"):
+            with open(output_file_abs, "w") as f:
+                json.dump(output_data, f, indent=4)
 
-    print(f"✅ Completed in {round(time.time() - start_time, 2)}s. Output saved to {output_file_abs}")
+    report_run_stats(start_time, batch_output_folder_abs)
 
 if __name__ == "__main__":
     # This entry point runs the processing logic.
     # It relies on Docker's volume mounts to provide PDFs in `data/input`
     # and to collect the output from `output/result.json`.
-    process()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Persona-driven PDF section ranking and summarization.")
+    parser.add_argument("--device", default=None, help="Device for the embedding model, e.g. 'cpu' or 'cuda' (default: auto).")
+    parser.add_argument("--threads", type=int, default=None, help="Number of torch CPU threads for the embedding model.")
+    parser.add_argument("--backend", choices=["torch", "torch-int8", "onnx"], default=None, help="Encoder backend (default: torch).")
+    parser.add_argument("--onnx-dir", default=None, help="Exported ONNX encoder directory (with --backend onnx), see benchmarks/export_onnx.py.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Number of texts per embedding encode batch.")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Disable the persistent on-disk embedding cache.")
+    parser.add_argument("--embedding-cache-dir", default=None, help="Directory for the persistent embedding cache.")
+    parser.add_argument("--no-extraction-cache", action="store_true", help="Always re-parse PDFs instead of using the extraction cache.")
+    parser.add_argument("--refresh-extraction-cache", action="store_true", help="Re-parse every PDF and overwrite its extraction cache entry.")
+    parser.add_argument("--pdf-backend", choices=("auto",) + pdf_backends.BACKENDS, default=None,
+                        help="PDF text backend (default: auto, the fastest installed; PyPDF2 is the fallback).")
+    parser.add_argument("--page-range-size", type=int, default=None,
+                        help="Read PDFs longer than this many pages as parallel page ranges (0 disables).")
+    parser.add_argument("--workers", type=int, default=None, help="Processes used for PDF extraction (default: one per CPU).")
+    parser.add_argument("--batch", default=None, metavar="CONFIGS_JSON", help="Run every persona/job config in this JSON list against one collection.")
+    parser.add_argument("--watch", action="store_true", help="Keep running, and re-rank and rewrite the output whenever the input PDFs or config change.")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between input folder scans (with --watch, default: 2).")
+    parser.add_argument("--serve", action="store_true", help="Run as a long-lived HTTP ranking server instead of a one-shot run.")
+    parser.add_argument("--host", default="127.0.0.1", help="Server bind address (with --serve).")
+    parser.add_argument("--port", type=int, default=8080, help="Server port (with --serve).")
+    parser.add_argument("--unix-socket", default=None, help="Serve on this Unix socket path instead of TCP (with --serve).")
+    parser.add_argument("--batch-window-ms", type=float, default=5, help="How long the server waits to batch concurrent encodes.")
+    parser.add_argument("--index", default=None, metavar="INDEX_DIR", help="Rank through a persistent section index in this directory (built on first use).")
+    parser.add_argument("--candidates", type=int, default=100, help="Sections kept as ranking candidates (with --index or --stream).")
+    parser.add_argument("--stream", action="store_true", help="Stream sections page by page into the encoder in bounded memory.")
+    parser.add_argument("--whole-document", choices=["keep", "drop", "chunk"], default="keep", help="Whole-document section handling (with --stream).")
+    parser.add_argument("--chunk-pages", type=int, default=10, help="Pages per whole-document chunk (with --stream --whole-document chunk).")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap extraction with embedding: each document is embedded as soon as it is parsed.")
+    parser.add_argument("--queue-depth", type=int, default=None, help="Parsed documents allowed to wait for the embedding worker (with --pipeline).")
+    parser.add_argument("--ann", action="store_true", help="Use approximate IVF search in the section index (with --index).")
+    parser.add_argument("--n-probe", type=int, default=8, help="IVF clusters searched per query (with --ann). More clusters raise recall towards exact search at the cost of latency; see benchmarks/bench_section_index.py.")
+    parser.add_argument("--quantize-index", action="store_true", help="Store index embeddings as int8 (with --index; an index built without it is rebuilt).")
+    parser.add_argument("--no-section-chunking", action="store_true", help="Embed each section as one text, letting the model truncate long ones.")
+    parser.add_argument("--chunk-pooling", choices=["max", "mean"], default=None, help="How chunk scores of a long section are pooled (default: max).")
+    parser.add_argument("--max-chunks", type=int, default=None, help="Most model-window chunks embedded per section; text beyond them is skipped.")
+    parser.add_argument("--near-duplicate-filter", action="store_true", help="Drop near-duplicate sections before embedding and ranking (changes the output; off by default).")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=None, help="Shingle Jaccard similarity from which a section counts as a near-duplicate (default: 0.9).")
+    parser.add_argument("--keyword-boosts", default=None, metavar="TABLE_JSON", help="Keyword boost table to rank with (default: app/keyword_boosts.json).")
+    parser.add_argument("--warm-up", action="store_true", help="Load the model and run a warm-up encode before processing.")
+    parser.add_argument("--trace", default=None, metavar="TRACE_JSON", help="Write a JSON trace of timed spans and counters for this run.")
+    parser.add_argument("--profile", default=None, metavar="PROFILE_FILE", help="Run under cProfile and dump the stats to this file.")
+    args = parser.parse_args()
+
+    model_provider.configure(device=args.device, num_threads=args.threads, batch_size=args.batch_size,
+                             backend=args.backend, onnx_dir=args.onnx_dir)
+    embedding_cache.configure(enabled=False if args.no_embedding_cache else None, cache_dir=args.embedding_cache_dir)
+    extraction_cache.configure(enabled=False if args.no_extraction_cache else None,
+                               force_refresh=args.refresh_extraction_cache)
+    pdf_backends.configure(backend=args.pdf_backend, page_range_size=args.page_range_size)
+    chunker.configure(enabled=False if args.no_section_chunking else None, pooling=args.chunk_pooling,
+                      max_chunks=args.max_chunks)
+    keyword_boosts.configure(table_file=args.keyword_boosts)
+    near_duplicates.configure(enabled=True if args.near_duplicate_filter else None, threshold=args.near_duplicate_threshold)
+    tracing.configure(trace_file=args.trace, profile_file=args.profile)
+    tracing.start_run()
+    try:
+        if args.warm_up:
+            model_provider.warm_up()
+        if args.serve:
+            from app.server import serve
+            serve(os.path.join(os.getcwd(), INPUT_FOLDER_REL), host=args.host, port=args.port, unix_socket=args.unix_socket,
+                  extraction_workers=args.workers, batch_window_ms=args.batch_window_ms)
+        elif args.watch:
+            from app.watcher import watch
+            watch(os.path.join(os.getcwd(), INPUT_FOLDER_REL), os.path.join(os.getcwd(), OUTPUT_FILE_REL),
+                  os.path.join(os.getcwd(), INPUT_CONFIG_FILE_REL), extraction_workers=args.workers,
+                  poll_interval=args.poll_interval, batch_size=args.batch_size)
+        elif args.batch:
+            with tracing.span("process_batch"):
+                process_batch(args.batch, extraction_workers=args.workers, pipeline=args.pipeline,
+                              queue_depth=args.queue_depth)
+        else:
+            with tracing.span("process"):
+                process(extraction_workers=args.workers, index_dir=args.index, candidate_k=args.candidates,
+                        ann=args.ann, n_probe=args.n_probe, quantize_index=args.quantize_index, stream=args.stream,
+                        whole_document=args.whole_document, chunk_pages=args.chunk_pages,
+                        pipeline=args.pipeline, queue_depth=args.queue_depth)
+    finally:
+        # Written even when the run fails, so a slow or broken run can be inspected afterwards.
+        tracing.finish_run(arguments=vars(args), backend=model_provider.get_backend_name(),
+                           model_load_seconds=model_provider.get_load_seconds())
\ No newline at end of file